@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Scaling benchmark of pandangas on synthetic networks.
+
+    Each phase (network construction with the vectorized generators, the same network built again one create_* call
+    per element, topology, gas properties, level compilation, runpp) is timed on radial, grid-meshed and multi-level
+    networks of increasing size, then run again under tracemalloc for its peak memory. The time of runpp is broken
+    down into solve and results with net.res_stats. The per-element construction is skipped above MAX_BUS_EACH buses.
+
+    Usage:
+
+    $ python benchmarks/bench_scaling.py
+    $ python benchmarks/bench_scaling.py --sizes 10 100 1000 --networks radial grid --no-memory --out bench.csv
+
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from thermo.chemical import Chemical
+
+import pandangas as pg
+import pandangas.generators as gen
+import pandangas.simulation as sim
+import pandangas.topology as top
+
+
+SIZES = (10, 100, 1000, 10000, 100000)
+NETWORKS = ("radial", "grid", "multi_level")
+T_GRND = 10 + 273.15
+MAX_BUS_EACH = 1000  # the per-element construction is quadratic, too slow above
+
+
+def _build(kind, n_bus):
+    if kind == "radial":
+        return gen.create_radial_network(n_bus)
+    if kind == "grid":
+        side = max(int(np.sqrt(n_bus)), 2)
+        return gen.create_grid_network(side, side)
+    n_districts = max(int(np.sqrt(n_bus / 10)), 1)
+    return gen.create_multi_level_network(n_districts, max(n_bus // n_districts, 2), district="grid")
+
+
+def _build_each(net):
+    """
+    Build a given network again with one create_* call per element, as a user script would
+
+    :param net: the given network
+    :return: the new network
+    """
+    new = pg.create_empty_network()
+    for bus in net.bus.itertuples():
+        pg.create_bus(new, bus.level, bus.name, None if pd.isnull(bus.zone) else bus.zone)
+    for feeder in net.feeder.itertuples():
+        pg.create_feeder(new, feeder.bus, feeder.p_lim_kW, feeder.p_Pa, feeder.name)
+    for station in net.station.itertuples():
+        pg.create_station(new, station.bus_high, station.bus_low, station.p_lim_kW, station.p_Pa, station.name)
+    for pipe in net.pipe.itertuples():
+        pg.create_pipe(new, pipe.from_bus, pipe.to_bus, pipe.length_m, pipe.diameter_m, pipe.name, pipe.material,
+                       pipe.in_service)
+    for load in net.load.itertuples():
+        pg.create_load(new, load.bus, load.p_kW, load.name, load.min_p_Pa, load.scaling)
+    return new
+
+
+def _phases(kind, n_bus):
+    """
+    The phases of a benchmark run, in order, each one a function taking the network (None for the construction)
+
+    :return: a list of (name, function)
+    """
+    phases = [("build", lambda net: _build(kind, n_bus))]
+    if n_bus <= MAX_BUS_EACH:
+        phases.append(("build_each", _build_each))
+    return phases + [
+        ("topology", lambda net: top.create_topology(net)),
+        ("nxgraph", lambda net: top.create_nxgraph(net)),
+        ("gas", lambda net: [Chemical("natural gas", T=T_GRND, P=net.LEVELS[level])
+                             for level in net.bus["level"].unique()]),
+        ("compile", lambda net: sim._compile_levels(net, T_GRND)),
+        ("runpp", lambda net: pg.runpp(net, t_grnd=T_GRND, use_cache=False)),
+    ]
+
+
+def _run(kind, n_bus, memory):
+    net = None
+    rows = []
+    for phase, func in _phases(kind, n_bus):
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        out = func(net)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 1E6
+            tracemalloc.stop()
+        if phase == "build":
+            net = out
+        rows.append({"network": kind, "n_bus": len(net.bus.index), "phase": phase, "time_s": elapsed,
+                     "peak_MB": peak})
+
+    # breakdown of runpp given by net.res_stats
+    for phase in ("solve", "results"):
+        rows.append({"network": kind, "n_bus": len(net.bus.index), "phase": "  " + phase,
+                     "time_s": net.res_stats[phase + "_s"].sum(), "peak_MB": None})
+    return rows
+
+
+def run_benchmark(sizes=SIZES, networks=NETWORKS, memory=True):
+    """
+    Run the benchmark
+
+    :param sizes: approximate numbers of buses of the networks
+    :param networks: kinds of networks among "radial", "grid" and "multi_level"
+    :param memory: if True, run each network a second time under tracemalloc for the peak memory of each phase
+    :return: a DataFrame with one row per network, size and phase
+    """
+    rows = []
+    print("{:>12} {:>8} {:>10} {:>10} {:>10}".format("network", "n_bus", "phase", "time_s", "peak_MB"))
+    for kind in networks:
+        for n_bus in sizes:
+            timed = _run(kind, n_bus, memory=False)
+            if memory:
+                for row, traced in zip(timed, _run(kind, n_bus, memory=True)):
+                    row["peak_MB"] = traced["peak_MB"]
+            for row in timed:
+                print("{network:>12} {n_bus:>8} {phase:>10} {time_s:>10.4g} {peak:>10}".format(
+                    peak="-" if row["peak_MB"] is None else "{:.4g}".format(row["peak_MB"]), **row), flush=True)
+            rows += timed
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--networks", nargs="+", choices=NETWORKS, default=NETWORKS)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--out", help="CSV file to write the results to")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.sizes, args.networks, memory=not args.no_memory)
+    if args.out:
+        res.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
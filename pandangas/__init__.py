@@ -7,4 +7,10 @@
 
 from pandangas.core import *
 from pandangas.results import *
+from pandangas.aio import runpp_async, stream_runpp, stream_timeseries
+from pandangas.batch import run_scenarios
+from pandangas.contingency import run_contingencies
+from pandangas.file_io import save_network, load_network, save_results, load_results
+from pandangas.model import compile_model, Model
+from pandangas.timeseries import runpp_timeseries, iter_timeseries
 from pandangas.utilities import get_index
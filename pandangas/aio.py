@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the asyncio variants of the simulation methods.
+
+    The solves run on a thread, one pressure level (or time step) at a time, so the event loop is never blocked, and
+    the results of each level can be streamed as soon as it is solved. A cancelled or timed out run stops after the
+    level being solved: the threads cannot be interrupted in the middle of a solve.
+
+    Usage:
+
+    >>> import pandangas as pg
+
+    >>> await pg.runpp_async(net, timeout=10.0)
+
+    >>> async for level in pg.stream_runpp(net):
+    ...     send(level["level"], level["res_bus"])
+
+    >>> async for step, res in pg.stream_timeseries(net, profiles, timeout=60.0):
+    ...     send(step, res["p_Pa"])
+
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pandangas.results as results
+import pandangas.timeseries as timeseries
+
+
+_END = object()
+
+
+async def iterate(steps, executor=None, timeout=None):
+    """
+    Iterate over a generator without blocking the event loop, each step running on a thread
+
+    When the iteration stops early (cancellation, timeout, error or aclose), the step being computed is awaited, as
+    the thread cannot be interrupted, and the generator is closed before the exception is raised again.
+
+    :param steps: the generator, e.g. given by iter_runpp or iter_timeseries
+    :param executor: a thread pool executor, or None for a new thread (default: None)
+    :param timeout: the time allowed for the whole iteration (in [s]), asyncio.TimeoutError being raised once it is
+    over, or None for no limit (default: None)
+    :return: an async generator of the items of the generator
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    executor = ThreadPoolExecutor(max_workers=1) if own_executor else executor
+    deadline = None if timeout is None else loop.time() + timeout
+
+    future = None
+    try:
+        while True:
+            future = executor.submit(next, steps, _END)
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            item = await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+            if item is _END:
+                return
+            yield item
+    finally:
+        try:
+            # a generator cannot be closed while it runs on the thread: wait for the step being computed
+            if future is not None and not future.done():
+                try:
+                    await asyncio.shield(asyncio.wrap_future(future))
+                except asyncio.CancelledError:
+                    # cancelled again while waiting, close it once the step is over
+                    future.add_done_callback(lambda _: steps.close())
+                    raise
+                except Exception:
+                    pass  # the exception being raised is the one of the iteration
+            steps.close()
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False)
+
+
+def stream_runpp(net, executor=None, timeout=None, **kwargs):
+    """
+    Compute the pressures and mass flows of a given network, yielding the results of each level as soon as it is
+    solved, see results.iter_runpp
+
+    :param net: the given network
+    :param executor: a thread pool executor, or None for a new thread (default: None)
+    :param timeout: the time allowed for the whole run (in [s]), or None for no limit (default: None)
+    :param kwargs: the parameters of runpp, but callback
+    :return: an async generator of the results of each level
+    """
+    return iterate(results.iter_runpp(net, **kwargs), executor, timeout)
+
+
+def stream_timeseries(net, load_profiles, executor=None, timeout=None, **kwargs):
+    """
+    Compute the pressures and mass flows of a given network for each time step of some load profiles, yielding the
+    results of each time step as soon as it is solved, see timeseries.iter_timeseries
+
+    :param net: the given network
+    :param load_profiles: a DataFrame with one row per time step and one column per load name
+    :param executor: a thread pool executor, or None for a new thread (default: None)
+    :param timeout: the time allowed for all the time steps (in [s]), or None for no limit (default: None)
+    :param kwargs: the parameters of runpp_timeseries
+    :return: an async generator of (index of the time step, dict of arrays)
+    """
+    return iterate(timeseries.iter_timeseries(net, load_profiles, **kwargs), executor, timeout)
+
+
+async def runpp_async(net, executor=None, timeout=None, **kwargs):
+    """
+    Compute the pressures and mass flows of a given network without blocking the event loop, and store them in the
+    results tables as runpp
+
+    If the run is cancelled or times out, the level being solved is awaited before asyncio.CancelledError or
+    asyncio.TimeoutError is raised, and the results tables are left as they were.
+
+    :param net: the given network
+    :param executor: a thread pool executor, or None for a new thread (default: None)
+    :param timeout: the time allowed for the whole run (in [s]), asyncio.TimeoutError being raised once it is over,
+    or None for no limit (default: None)
+    :param kwargs: the parameters of runpp, the callback being called on the event loop
+    :return:
+    """
+    callback = kwargs.pop("callback", None)
+    levels = stream_runpp(net, executor, timeout, **kwargs)
+    try:
+        async for level in levels:
+            if callback is not None:
+                callback(level["stats"])
+    finally:
+        await levels.aclose()
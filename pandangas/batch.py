@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the batch simulation of scenarios.
+
+    Usage:
+
+    >>> import pandangas as pg
+
+    >>> scenarios = [
+    ...     {"load": {"scaling": {"LOAD2": 1.2, "LOAD3": 0.8}}},
+    ...     {"pipe": {"in_service": {"PIPE3": False}}},
+    ... ]
+    >>> res = pg.run_scenarios(net, scenarios, n_workers=4)
+    >>> res["p_Pa"]  # one row per scenario, one column per bus
+
+"""
+
+import copy
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import pandangas.core as core
+import pandangas.results as results
+
+
+_BASE_NET = None
+
+
+def _apply_scenario(net, scenario):
+    """
+    Apply the modifications of a scenario to a given network
+
+    :param net: the given network
+    :param scenario: a dict {table: {column: {element name: value}}}, e.g. {"load": {"scaling": {"LOAD2": 1.2}}}
+    :return:
+    """
+    for table, columns in scenario.items():
+        try:
+            assert table in net.name_index
+        except AssertionError:
+            msg = "The table {} is not in {}".format(table, list(net.name_index))
+            logging.error(msg)
+            raise ValueError(msg)
+
+        df = getattr(net, table)
+        for col, values in columns.items():
+            unknown = [name for name in values if name not in net.name_index[table]]
+            try:
+                assert col in df.columns and not unknown
+            except AssertionError:
+                msg = "The column {} or the elements {} do not exist in the table {} !".format(col, unknown, table)
+                logging.error(msg)
+                raise ValueError(msg)
+
+            idx = [net.name_index[table][name] for name in values]
+            core._add_categories(df, col, list(values.values()))
+            df.loc[idx, col] = list(values.values())
+
+
+def _results_as_arrays(net):
+    """
+    Gather the results of a given network as arrays following the row order of the element tables
+
+    :param net: the given network
+    :return: a dict of arrays "p_Pa", "m_dot_pipe", "m_dot_feeder" and "m_dot_station"
+    """
+    return {
+        "p_Pa": net.res_bus["p_Pa"].reindex(net.bus.index).values.astype(float),
+        "m_dot_pipe": net.res_pipe["m_dot_kg/s"].reindex(net.pipe.index).values.astype(float),
+        "m_dot_feeder": net.res_feeder["m_dot_kg/s"].reindex(net.feeder.index).values.astype(float),
+        "m_dot_station": net.res_station["m_dot_kg/s"].reindex(net.station.index).values.astype(float),
+    }
+
+
+def _init_worker(net):
+    global _BASE_NET
+    _BASE_NET = net
+
+
+def _run_task(args):
+    func, task = args
+    return func(_BASE_NET, task)
+
+
+def _map_on_pool(net, func, tasks, n_workers=None, chunksize=1):
+    """
+    Call func(net, task) for each task, on a pool of processes that receive the network only once
+
+    :param net: the given network, func must not modify it
+    :param func: a function defined at module level, so it can be sent to the workers
+    :param tasks: the list of tasks
+    :param n_workers: the number of worker processes, the number of CPUs if None, no pool at all if 1 (default: None)
+    :param chunksize: the number of tasks sent at once to a worker (default: 1)
+    :return: the list of the results of func, in the order of the tasks
+    """
+    if n_workers == 1:
+        return [func(net, task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(net,)) as executor:
+        return list(executor.map(_run_task, [(func, task) for task in tasks], chunksize=chunksize))
+
+
+def _run_scenario(base, task):
+    scenario, kwargs = task
+    net = copy.deepcopy(base)
+    _apply_scenario(net, scenario)
+    results.runpp(net, **kwargs)
+    return _results_as_arrays(net)
+
+
+def run_scenarios(net, scenarios, n_workers=None, chunksize=1, **kwargs):
+    """
+    Run runpp on a given network for several independent scenarios, in parallel on a pool of processes
+
+    The network is sent once to each worker process, each scenario is applied to a copy of it, and only the result
+    arrays are sent back. The given network is left untouched.
+
+    :param net: the given network
+    :param scenarios: a list of scenarios, each one a dict {table: {column: {element name: value}}}
+    :param n_workers: the number of worker processes, the number of CPUs if None, no pool at all if 1 (default: None)
+    :param chunksize: the number of scenarios sent at once to a worker (default: 1)
+    :param kwargs: the arguments passed to runpp (t_grnd, solver, ...)
+    :return: a dict of arrays with one row per scenario: "p_Pa" (one column per bus), "m_dot_pipe", "m_dot_feeder"
+    and "m_dot_station" (one column per pipe, feeder or station, in [kg/s]), the columns following the row order of
+    the tables
+    """
+    res = _map_on_pool(net, _run_scenario, [(scenario, kwargs) for scenario in scenarios], n_workers, chunksize)
+
+    sizes = {"p_Pa": len(net.bus.index), "m_dot_pipe": len(net.pipe.index),
+             "m_dot_feeder": len(net.feeder.index), "m_dot_station": len(net.station.index)}
+    return {key: np.vstack([r[key] for r in res]) if res else np.zeros((0, n)) for key, n in sizes.items()}
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the N-1 contingency analysis.
+
+    Usage:
+
+    >>> import pandangas as pg
+
+    >>> table = pg.run_contingencies(net, n_workers=4)
+    >>> table.loc[table["p_violations"] > 0]
+
+"""
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csgraph
+
+import pandangas.results as results
+import pandangas.topology as top
+from pandangas.batch import _map_on_pool
+from pandangas.core import _rebuild_name_index
+
+
+def _islanded_buses(net):
+    """
+    Find the buses of a given network that cannot be supplied by any feeder, through the in service pipes (in both
+    directions) and the stations (from high to low pressure only)
+
+    :param net: the given network
+    :return: the list of the names of the islanded buses
+    """
+    topo = top.create_topology(net)
+    n_bus = len(topo["bus_name"])
+    rows = np.concatenate((topo["pipe_from"], topo["pipe_to"], topo["station_from"]))
+    cols = np.concatenate((topo["pipe_to"], topo["pipe_from"], topo["station_to"]))
+    adj = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_bus, n_bus))
+
+    supplied = np.zeros(n_bus, dtype=bool)
+    for bus in top._positions(topo["bus_name"], net.feeder["bus"].values):
+        if bus >= 0 and not supplied[bus]:
+            supplied[csgraph.breadth_first_order(adj, bus, return_predecessors=False)] = True
+    return topo["bus_name"][~supplied].tolist()
+
+
+def _remove_station(net, station):
+    """
+    Take a station out of a given network, its two buses become NODE buses
+
+    :param net: the given network
+    :param station: the name of the station
+    :return:
+    """
+    idx = net.name_index["station"][station]
+    buses = [net.station.at[idx, "bus_high"], net.station.at[idx, "bus_low"]]
+    net.bus.loc[net.bus["name"].isin(buses), "type"] = "NODE"
+    net.station = net.station.drop(idx)
+    _rebuild_name_index(net)
+
+
+def _remove_buses(net, buses):
+    """
+    Take some buses out of a given network, with the pipes, loads and stations connected to them
+
+    :param net: the given network
+    :param buses: the names of the buses
+    :return:
+    """
+    stations = net.station.loc[net.station["bus_high"].isin(buses) | net.station["bus_low"].isin(buses), "name"]
+    for station in stations:
+        _remove_station(net, station)
+
+    net.bus = net.bus.loc[~net.bus["name"].isin(buses)]
+    net.pipe = net.pipe.loc[~(net.pipe["from_bus"].isin(buses) | net.pipe["to_bus"].isin(buses))]
+    net.load = net.load.loc[~net.load["bus"].isin(buses)]
+    _rebuild_name_index(net)
+
+
+def _violations(net):
+    """
+    Summarize the results of a given network: lowest pressure at the loads, number of loads under their minimum
+    pressure, and highest loading of the pipes, stations and feeders
+
+    :param net: the given network, already simulated
+    :return: a dict
+    """
+    p_bus = pd.Series(net.res_bus["p_Pa"].values, index=net.res_bus["name"].values, dtype=float)
+    p_load = p_bus.reindex(net.load["bus"].values).values
+    loading = pd.concat([net.res_pipe["loading_%"], net.res_station["loading_%"], net.res_feeder["loading_%"]])
+    return {
+        "min_p_Pa": np.min(p_load) if len(p_load) else np.nan,
+        "p_violations": int(np.sum(p_load < net.load["min_p_Pa"].values.astype(float))),
+        "max_loading_%": loading.astype(float).max() if len(loading) else np.nan,
+    }
+
+
+def _run_contingency(base, task):
+    (table, name), kwargs = task
+    net = copy.deepcopy(base)
+
+    if table == "pipe":
+        net.pipe.at[net.name_index["pipe"][name], "in_service"] = False
+    else:
+        _remove_station(net, name)
+
+    islanded = _islanded_buses(net)
+    n_islanded = int(net.load["bus"].isin(islanded).sum())
+    _remove_buses(net, islanded)
+
+    logging.debug("CONTINGENCY {} {}: {} islanded buses".format(table, name, len(islanded)))
+    if len(net.bus.index) > 0:
+        results.runpp(net, **kwargs)
+        res = _violations(net)
+    else:
+        res = {"min_p_Pa": np.nan, "p_violations": 0, "max_loading_%": np.nan}
+
+    res.update({"name": name, "type": table, "islanded_loads": n_islanded})
+    return res
+
+
+def run_contingencies(net, pipes=None, stations=None, n_workers=None, chunksize=1, **kwargs):
+    """
+    Run a N-1 contingency analysis of a given network: simulate the outage of each pipe and each station, one at a
+    time, and report the violations
+
+    The base case is simulated once and its results are used as initial guess of every contingency. The buses that
+    cannot be supplied anymore are taken out of the simulation and their loads are counted as islanded. The
+    contingencies are run on a pool of processes, see run_scenarios. The given network is left untouched.
+
+    :param net: the given network
+    :param pipes: the names of the pipes to take out, all the pipes in service if None (default: None)
+    :param stations: the names of the stations to take out, all the stations if None (default: None)
+    :param n_workers: the number of worker processes, the number of CPUs if None, no pool at all if 1 (default: None)
+    :param chunksize: the number of contingencies sent at once to a worker (default: 1)
+    :param kwargs: the arguments passed to runpp (t_grnd, solver, ...)
+    :return: a DataFrame with one row per contingency and the columns "name", "type" ("pipe" or "station"),
+    "min_p_Pa" (lowest pressure at the loads), "p_violations" (number of loads under their min_p_Pa),
+    "max_loading_%" (highest loading of the pipes, stations and feeders) and "islanded_loads" (number of loads that
+    cannot be supplied)
+    """
+    if pipes is None:
+        pipes = net.pipe.loc[net.pipe["in_service"] != False, "name"].tolist()
+    if stations is None:
+        stations = net.station["name"].tolist()
+
+    for table, names in [("pipe", pipes), ("station", stations)]:
+        unknown = [name for name in names if name not in net.name_index[table]]
+        try:
+            assert not unknown
+        except AssertionError:
+            msg = "The elements {} do not exist in the table {} !".format(unknown, table)
+            logging.error(msg)
+            raise ValueError(msg)
+
+    base = copy.deepcopy(net)
+    results.runpp(base, **kwargs)
+    kwargs["init"] = "results"
+
+    tasks = [(("pipe", pipe), kwargs) for pipe in pipes] + [(("station", stat), kwargs) for stat in stations]
+    res = _map_on_pool(base, _run_contingency, tasks, n_workers, chunksize)
+
+    columns = ["name", "type", "min_p_Pa", "p_violations", "max_loading_%", "islanded_loads"]
+    return pd.DataFrame(res, columns=columns)
@@ -30,6 +30,7 @@
 
 """
 
+import numpy as np
 import pandas as pd
 import logging
 
@@ -37,6 +38,33 @@ import logging
 logging.basicConfig(level=logging.WARNING)
 
 
+BUS_TYPES = ("NODE", "SINK", "SRCE")
+
+# dtype of the columns of each table, "category" for the columns taking few distinct values, see _typed
+SCHEMAS = {
+    "bus": {"name": object, "level": "category", "zone": "category", "type": pd.CategoricalDtype(BUS_TYPES)},
+    "pipe": {"name": object, "from_bus": object, "to_bus": object, "length_m": "float64", "diameter_m": "float64",
+             "material": "category", "in_service": "bool"},
+    "load": {"name": object, "bus": object, "p_kW": "float64", "min_p_Pa": "float64", "scaling": "float64"},
+    "feeder": {"name": object, "bus": object, "p_lim_kW": "float64", "p_Pa": "float64"},
+    "station": {"name": object, "bus_high": object, "bus_low": object, "p_lim_kW": "float64", "p_Pa": "float64"},
+
+    "res_bus": {"name": object, "p_Pa": "float64", "p_bar": "float64"},
+    "res_pipe": {"name": object, "m_dot_kg/s": "float64", "v_m/s": "float64", "p_kW": "float64",
+                 "loading_%": "float64"},
+    "res_feeder": {"name": object, "m_dot_kg/s": "float64", "p_kW": "float64", "loading_%": "float64"},
+    "res_station": {"name": object, "m_dot_kg/s": "float64", "p_kW": "float64", "loading_%": "float64"},
+    "res_load": {"name": object, "p_Pa": "float64", "m_dot_kg/s": "float64", "p_kW": "float64", "p_ok": "bool"},
+
+    # one row per level solved by the last runpp, see simulation._run_level
+    "res_stats": {"level": "category", "solver": "category", "cached": "bool", "n_nodes": "int64",
+                  "n_pipes": "int64", "n_components": "int64", "n_nodes_reduced": "int64", "n_pipes_reduced": "int64",
+                  "fingerprint_s": "float64", "topology_s": "float64", "gas_s": "float64", "compile_s": "float64",
+                  "solve_s": "float64", "results_s": "float64", "n_fev": "int64", "n_jev": "int64",
+                  "n_iter": "float64", "residual": "float64"},
+}
+
+
 class _Network:
 
     # TODO: add H2/CH4 composition
@@ -44,20 +72,23 @@ class _Network:
     LHV = 38.1E3  # kJ/kg
     V_MAX = 2.0   # m/s
 
+    # friction factor of turbulent flows, see friction.CORRELATIONS, and (Re_min, Re_max) to blend it smoothly with the
+    # laminar one, or None to switch at Re 2040
+    FRICTION = "clamond"
+    RE_BLEND = None
+
     def __init__(self):
 
-        self.bus = pd.DataFrame(columns=["name", "level", "zone", "type"])
-        self.pipe = pd.DataFrame(columns=["name", "from_bus", "to_bus", "length_m", "diameter_m", "material", "in_service"])
-        self.load = pd.DataFrame(columns=["name", "bus", "p_kW", "min_p_Pa", "scaling"])
-        self.feeder = pd.DataFrame(columns=["name", "bus", "p_lim_kW", "p_Pa"])
-        self.station = pd.DataFrame(columns=["name", "bus_high", "bus_low", "p_lim_kW", "p_Pa"])
+        for table in SCHEMAS:
+            setattr(self, table, _empty_table(table))
 
-        self.res_bus = pd.DataFrame(columns=["name", "p_Pa", "p_bar"])
-        self.res_pipe = pd.DataFrame(columns=["name", "m_dot_kg/s", "v_m/s", "p_kW", "loading_%"])
-        self.res_feeder = pd.DataFrame(columns=["name", "m_dot_kg/s", "p_kW", "loading_%"])
-        self.res_station = pd.DataFrame(columns=["name", "m_dot_kg/s", "p_kW", "loading_%"])
+        self.keys = set(SCHEMAS)
 
-        self.keys = {"bus", "pipe", "load", "feeder", "station", "res_bus", "res_pipe", "res_feeder", "res_station"}
+        # name -> row index of each element table, kept in sync by the create_* methods
+        self.name_index = {"bus": {}, "pipe": {}, "load": {}, "feeder": {}, "station": {}}
+
+        # compiled levels and results of runpp, reused while the tables of a level do not change
+        self.cache = {}
 
     def __repr__(self):
         r = "This pandangas network includes the following parameter tables:"
@@ -81,6 +112,49 @@ class _Network:
         return r
 
 
+def _bus_positions(net, buses):
+    """
+    Positions of several buses in the bus table of a given network, looked up by name in net.name_index, checked
+    against the table, the names missing from the index or stale (tables edited by hand) being looked up in the table
+    (first bus if a name is duplicated)
+
+    :param net: the given network
+    :param buses: the names of the buses
+    :return: an array of positions, -1 for the buses that do not exist
+    """
+    buses = np.asarray(pd.Series(buses, dtype=object).values, dtype=object)
+    names = net.bus["name"].values
+    index = net.name_index["bus"]
+
+    if net.bus.index.is_unique:
+        pos = net.bus.index.get_indexer([index.get(bus, np.nan) for bus in buses])
+    else:
+        pos = np.full(len(buses), -1)
+    ok = pos >= 0
+    ok[ok] = names[pos[ok]] == buses[ok]
+
+    if not ok.all():
+        table = pd.Series(np.arange(len(names)), index=names)
+        table = table[~table.index.duplicated()]
+        pos[~ok] = table.reindex(buses[~ok]).fillna(-1).values.astype(int)
+    return pos
+
+
+def _bus_index(net, bus):
+    """
+    Row index of a bus of a given network, see _bus_positions
+
+    :param net: the given network
+    :param bus: the name of the bus
+    :return: the row index, or None if the bus does not exist
+    """
+    idx = net.name_index["bus"].get(bus)
+    if idx is not None and idx in net.bus.index and net.bus.at[idx, "name"] == bus:
+        return idx
+    pos = _bus_positions(net, [bus])[0]
+    return net.bus.index[pos] if pos >= 0 else None
+
+
 def _try_existing_bus(net, bus):
     """
     Check if a bus exist on a given network, raise ValueError and log an error if not
@@ -90,7 +164,7 @@ def _try_existing_bus(net, bus):
     :return:
     """
     try:
-        assert bus in net.bus.name.unique()
+        assert _bus_index(net, bus) is not None
     except AssertionError:
         msg = "The bus {} does not exist !".format(bus)
         logging.error(msg)
@@ -108,8 +182,10 @@ def _check_level(net, bus_a, bus_b, same=True):
     if False, the method will check if the node have different pressure levels (default: True)
     :return:
     """
-    lev_a = net.bus.loc[net.bus.name == bus_a, "level"].all()
-    lev_b = net.bus.loc[net.bus.name == bus_b, "level"].all()
+    _try_existing_bus(net, bus_a)
+    _try_existing_bus(net, bus_b)
+    lev_a = net.bus.at[_bus_index(net, bus_a), "level"]
+    lev_b = net.bus.at[_bus_index(net, bus_b), "level"]
 
     if same:
         try:
@@ -128,7 +204,8 @@ def _check_level(net, bus_a, bus_b, same=True):
 
 
 def _change_bus_type(net, bus, bus_type):
-    idx = net.bus.index[net.bus["name"] == bus].tolist()[0]
+    _try_existing_bus(net, bus)
+    idx = _bus_index(net, bus)
     old_type = net.bus.at[idx, "type"]
     try:
         assert old_type == "NODE"
@@ -140,6 +217,227 @@ def _change_bus_type(net, bus, bus_type):
     net.bus.at[idx, "type"] = bus_type
 
 
+def _update_name_index(net, table, names, idx):
+    """
+    Add new elements to the name index of a table of a given network (the first element is kept if a name is
+    duplicated)
+
+    :param net: the given network
+    :param table: the name of the table
+    :param names: the names of the new elements
+    :param idx: the row indexes of the new elements
+    :return:
+    """
+    index = net.name_index[table]
+    for name, i in zip(names, idx):
+        index.setdefault(name, i)
+
+
+def _rebuild_name_index(net):
+    """
+    Rebuild the name indexes of a given network from its tables, needed after editing the tables by hand
+
+    :param net: the given network
+    :return:
+    """
+    for table in net.name_index:
+        net.name_index[table] = {}
+        df = getattr(net, table)
+        _update_name_index(net, table, df["name"].values, df.index)
+
+
+def _bus_column(net, col, buses):
+    """
+    Return the values of a column of the bus table for several buses, looked up by name
+
+    :param net: the given network
+    :param col: the name of the column
+    :param buses: the names of the buses
+    :return: an array of values, None for the buses that do not exist
+    """
+    pos = _bus_positions(net, buses)
+    return np.where(pos >= 0, net.bus[col].values[pos], None)
+
+
+def _try_existing_buses(net, buses):
+    """
+    Check if several buses exist on a given network, raise ValueError and log an error if not
+
+    :param net: the given network
+    :param buses: the buses to check existence
+    :return:
+    """
+    buses = np.asarray(pd.Series(buses, dtype=object).values, dtype=object)
+    missing = pd.unique(buses[_bus_positions(net, buses) < 0])
+    try:
+        assert len(missing) == 0
+    except AssertionError:
+        msg = "The buses {} do not exist !".format(list(missing))
+        logging.error(msg)
+        raise ValueError(msg)
+
+
+def _check_levels(net, buses_a, buses_b, same=True):
+    """
+    Check the pressure levels of pairs of buses on a given network, raise ValueError and log an error depending on
+    parameter
+
+    :param net: the given network
+    :param buses_a: the first buses of the pairs
+    :param buses_b: the second buses of the pairs
+    :param same: if True, the method will check if the buses of each pair have the same pressure level
+    if False, the method will check if they have different pressure levels (default: True)
+    :return:
+    """
+    lev_a = _bus_column(net, "level", buses_a)
+    lev_b = _bus_column(net, "level", buses_b)
+
+    bad = (lev_a != lev_b) if same else (lev_a == lev_b)
+    try:
+        assert not bad.any()
+    except AssertionError:
+        pairs = list(zip(np.asarray(buses_a, dtype=object)[bad], np.asarray(buses_b, dtype=object)[bad]))
+        msg = "The buses {} have {} pressure level !".format(pairs, "a different" if same else "the same")
+        logging.error(msg)
+        raise ValueError(msg)
+
+
+def _check_bus_types(net, buses):
+    """
+    Check that several buses are NODE buses and appear only once, so they can all change type, raise ValueError and
+    log an error if not
+
+    :param net: the given network
+    :param buses: the buses that will change type
+    :return:
+    """
+    buses = pd.Series(buses, dtype=object)
+    bad = (_bus_column(net, "type", buses) != "NODE") | buses.duplicated(keep=False).values
+    try:
+        assert not bad.any()
+    except AssertionError:
+        msg = "The buses {} are already a SINK or a SRCE, or are used twice !".format(list(pd.unique(buses[bad])))
+        logging.error(msg)
+        raise ValueError(msg)
+
+
+def _check_load_buses(net, buses):
+    """
+    Check that several buses can take loads, raise ValueError and log an error if not: they are NODE buses or buses
+    that already have loads, any number of loads being attached to a bus
+
+    :param net: the given network
+    :param buses: the buses of the new loads
+    :return:
+    """
+    buses = pd.Series(buses, dtype=object)
+    bad = (_bus_column(net, "type", buses) != "NODE") & ~buses.isin(net.load["bus"]).values
+    try:
+        assert not bad.any()
+    except AssertionError:
+        msg = "The buses {} are already a SRCE or a station SINK !".format(list(pd.unique(buses[bad])))
+        logging.error(msg)
+        raise ValueError(msg)
+
+
+def _change_bus_types(net, buses, bus_type):
+    net.bus.loc[net.bus.index[_bus_positions(net, buses)], "type"] = bus_type
+
+
+def _empty_table(table):
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in SCHEMAS[table].items()})
+
+
+def _typed(table, df):
+    """
+    Cast the columns of a table to the dtypes of its schema, see SCHEMAS
+
+    :param table: the name of the table
+    :param df: the table
+    :return: the typed table
+    """
+    dtypes = {col: dtype for col, dtype in SCHEMAS[table].items() if col in df.columns and df[col].dtype != dtype}
+    return df.astype(dtypes, copy=False) if dtypes else df
+
+
+def _concat(table, dfs):
+    """
+    Concatenate several parts of a table, keeping the dtypes of its schema: the categories of the categorical columns
+    are merged, instead of falling back to object columns
+
+    :param table: the name of the table
+    :param dfs: the parts of the table (at least one)
+    :return: the table
+    """
+    dfs = [_typed(table, df) for df in dfs]
+    for col in dfs[0].columns:
+        if isinstance(dfs[0][col].dtype, pd.CategoricalDtype):
+            categories = pd.Index(np.concatenate([df[col].cat.categories.values for df in dfs])).unique()
+            for df in dfs:
+                if not df[col].cat.categories.equals(categories):
+                    df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(dfs) if len(dfs) > 1 else dfs[0]
+
+
+def _add_categories(df, col, values):
+    """
+    Add the missing values to the categories of a categorical column, so they can be assigned to its rows
+
+    :param df: the table
+    :param col: the name of the column
+    :param values: the values that will be assigned
+    :return:
+    """
+    if isinstance(df[col].dtype, pd.CategoricalDtype):
+        new = pd.Index(pd.unique(pd.Series(values, dtype=object).dropna())).difference(df[col].cat.categories)
+        if len(new):
+            df[col] = df[col].cat.add_categories(new)
+
+
+def _append_rows(net, table, rows):
+    """
+    Append several rows at once at the end of a table of a given network
+
+    :param net: the given network
+    :param table: the name of the table
+    :param rows: a dict of columns (values or arrays) or a DataFrame with the same columns as the table
+    :return:
+    """
+    df = getattr(net, table)
+    rows = pd.DataFrame(rows, columns=df.columns)
+    rows.index = pd.RangeIndex(len(df.index), len(df.index) + len(rows.index))
+    setattr(net, table, _concat(table, [df, rows]) if len(df.index) > 0 else _typed(table, rows))
+    _update_name_index(net, table, rows["name"].values, rows.index)
+
+
+def _append_row(net, table, row):
+    """
+    Append one row at the end of a table of a given network, in place, faster than _append_rows for a single element
+
+    :param net: the given network
+    :param table: the name of the table
+    :param row: the values of the row, one per column of the table
+    :return:
+    """
+    df = getattr(net, table)
+    idx = len(df.index)
+    values = dict(zip(df.columns, row))
+    for col, value in values.items():
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and value is not None \
+                and value not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([value])
+
+    # enlarging with one object column keeps the categorical columns, the other columns are cast back below
+    df.loc[idx, "name"] = values.pop("name")
+    for col, value in values.items():
+        if value is not None:
+            df.at[idx, col] = value
+    for col, dtype in SCHEMAS[table].items():
+        if df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    _update_name_index(net, table, [row[0]], [idx])
+
+
 def create_empty_network():
     """
     Create an empty network
@@ -166,8 +464,7 @@ def create_bus(net, level, name, zone=None):
         logging.error(msg)
         raise ValueError(msg)
 
-    idx = len(net.bus.index)
-    net.bus.loc[idx] = [name, level, zone, "NODE"]
+    _append_row(net, "bus", [name, level, zone, "NODE"])
     return name
 
 
@@ -190,14 +487,13 @@ def create_pipe(net, from_bus, to_bus, length_m, diameter_m, name, material="ste
     _try_existing_bus(net, to_bus)
     _check_level(net, from_bus, to_bus)
 
-    idx = len(net.pipe.index)
-    net.pipe.loc[idx] = [name, from_bus, to_bus, length_m, diameter_m, material, in_service]
+    _append_row(net, "pipe", [name, from_bus, to_bus, length_m, diameter_m, material, in_service])
     return name
 
 
 def create_load(net, bus, p_kW, name, min_p_Pa=0.022E5, scaling=1.0):
     """
-    Create a load attached to an existing bus in a given network
+    Create a load attached to an existing bus in a given network, a bus taking any number of loads
 
     :param net: the given network
     :param bus: the existing bus
@@ -208,11 +504,11 @@ def create_load(net, bus, p_kW, name, min_p_Pa=0.022E5, scaling=1.0):
     :return: name of the load
     """
     _try_existing_bus(net, bus)
+    _check_load_buses(net, [bus])
 
-    idx = len(net.load.index)
-    net.load.loc[idx] = [name, bus, p_kW, min_p_Pa, scaling]
+    _append_row(net, "load", [name, bus, p_kW, min_p_Pa, scaling])
 
-    _change_bus_type(net, bus, "SINK")
+    net.bus.at[_bus_index(net, bus), "type"] = "SINK"
     return name
 
 
@@ -229,8 +525,7 @@ def create_feeder(net, bus, p_lim_kW, p_Pa, name):
     """
     _try_existing_bus(net, bus)
 
-    idx = len(net.feeder.index)
-    net.feeder.loc[idx] = [name, bus, p_lim_kW, p_Pa]
+    _append_row(net, "feeder", [name, bus, p_lim_kW, p_Pa])
 
     _change_bus_type(net, bus, "SRCE")
     return name
@@ -252,9 +547,160 @@ def create_station(net, bus_high, bus_low, p_lim_kW, p_Pa, name):
     _try_existing_bus(net, bus_low)
     _check_level(net, bus_high, bus_low, same=False)
 
-    idx = len(net.station.index)
-    net.station.loc[idx] = [name, bus_high, bus_low, p_lim_kW, p_Pa]
+    _append_row(net, "station", [name, bus_high, bus_low, p_lim_kW, p_Pa])
 
     _change_bus_type(net, bus_high, "SINK")
     _change_bus_type(net, bus_low, "SRCE")
     return name
+
+
+def create_buses(net, level, name, zone=None):
+    """
+    Create several buses at once on a given network
+
+    Each parameter can be a single value, shared by all the buses, or an array with one value per bus. The columns of
+    a DataFrame can be passed directly with pg.create_buses(net, **df).
+
+    :param net: the given network
+    :param level: nominal pressure levels of the buses
+    :param name: names of the buses
+    :param zone: zones of the buses (default: None)
+    :return: names of the buses
+    """
+    rows = pd.DataFrame({"name": name, "level": level, "zone": zone, "type": "NODE"})
+
+    bad = ~rows["level"].isin(list(net.LEVELS))
+    try:
+        assert not bad.any()
+    except AssertionError:
+        msg = "The pressure level of the buses {} is not in {}".format(list(rows.loc[bad, "name"]), net.LEVELS)
+        logging.error(msg)
+        raise ValueError(msg)
+
+    _append_rows(net, "bus", rows)
+    return rows["name"].tolist()
+
+
+def create_pipes(net, from_bus, to_bus, length_m, diameter_m, name, material="steel", in_service=True):
+    """
+    Create several pipes at once between existing buses on a given network
+
+    Each parameter can be a single value, shared by all the pipes, or an array with one value per pipe. The columns of
+    a DataFrame can be passed directly with pg.create_pipes(net, **df).
+
+    :param net: the given network
+    :param from_bus: the names of the already existing buses where the pipes start
+    :param to_bus: the names of the already existing buses where the pipes end
+    :param length_m: lengths of the pipes (in [m])
+    :param diameter_m: inner diameters of the pipes (in [m])
+    :param name: names of the pipes
+    :param material: materials of the pipes
+    :param in_service: if False, the simulation will not take the pipe into account (default: True)
+    :return: names of the pipes
+    """
+    rows = pd.DataFrame({"name": name, "from_bus": from_bus, "to_bus": to_bus, "length_m": length_m,
+                         "diameter_m": diameter_m, "material": material, "in_service": in_service})
+
+    _try_existing_buses(net, pd.concat([rows["from_bus"], rows["to_bus"]]))
+    _check_levels(net, rows["from_bus"], rows["to_bus"])
+
+    _append_rows(net, "pipe", rows)
+    return rows["name"].tolist()
+
+
+def create_loads(net, bus, p_kW, name, min_p_Pa=0.022E5, scaling=1.0):
+    """
+    Create several loads at once attached to existing buses in a given network, a bus taking any number of loads
+
+    Each parameter can be a single value, shared by all the loads, or an array with one value per load. The columns of
+    a DataFrame can be passed directly with pg.create_loads(net, **df).
+
+    :param net: the given network
+    :param bus: the existing buses
+    :param p_kW: power consumed by the loads (in [kW])
+    :param name: names of the loads
+    :param min_p_Pa: minimum acceptable pressure
+    :param scaling: scaling factor for the loads (default: 1.0)
+    :return: names of the loads
+    """
+    rows = pd.DataFrame({"name": name, "bus": bus, "p_kW": p_kW, "min_p_Pa": min_p_Pa, "scaling": scaling})
+
+    _try_existing_buses(net, rows["bus"])
+    _check_load_buses(net, rows["bus"])
+
+    _append_rows(net, "load", rows)
+    _change_bus_types(net, rows["bus"], "SINK")
+    return rows["name"].tolist()
+
+
+def create_feeders(net, bus, p_lim_kW, p_Pa, name):
+    """
+    Create several feeders at once attached to existing buses in a given network
+
+    Each parameter can be a single value, shared by all the feeders, or an array with one value per feeder. The
+    columns of a DataFrame can be passed directly with pg.create_feeders(net, **df).
+
+    :param net: the given network
+    :param bus: the existing buses
+    :param p_lim_kW: maximum power flowing through the feeders
+    :param p_Pa: operating pressure level at the output of the feeders
+    :param name: names of the feeders
+    :return: names of the feeders
+    """
+    rows = pd.DataFrame({"name": name, "bus": bus, "p_lim_kW": p_lim_kW, "p_Pa": p_Pa})
+
+    _try_existing_buses(net, rows["bus"])
+    _check_bus_types(net, rows["bus"])
+
+    _append_rows(net, "feeder", rows)
+    _change_bus_types(net, rows["bus"], "SRCE")
+    return rows["name"].tolist()
+
+
+def create_stations(net, bus_high, bus_low, p_lim_kW, p_Pa, name):
+    """
+    Create several pressure stations at once between existing buses on different pressure levels in a given network
+
+    Each parameter can be a single value, shared by all the stations, or an array with one value per station. The
+    columns of a DataFrame can be passed directly with pg.create_stations(net, **df).
+
+    :param net: the given network
+    :param bus_high: the existing buses with higher nominal pressure
+    :param bus_low: the existing buses with lower nominal pressure
+    :param p_lim_kW: maximum power flowing through the stations
+    :param p_Pa: operating pressure level at the output of the stations
+    :param name: names of the stations
+    :return: names of the stations
+    """
+    rows = pd.DataFrame({"name": name, "bus_high": bus_high, "bus_low": bus_low, "p_lim_kW": p_lim_kW, "p_Pa": p_Pa})
+
+    _try_existing_buses(net, pd.concat([rows["bus_high"], rows["bus_low"]]))
+    _check_levels(net, rows["bus_high"], rows["bus_low"], same=False)
+    _check_bus_types(net, pd.concat([rows["bus_high"], rows["bus_low"]]))
+
+    _append_rows(net, "station", rows)
+    _change_bus_types(net, rows["bus_high"], "SINK")
+    _change_bus_types(net, rows["bus_low"], "SRCE")
+    return rows["name"].tolist()
+
+
+def add_categories(net, table, col, values):
+    """
+    Allow new values in a categorical column of a table of a given network (see SCHEMAS), so the table can then be
+    edited directly, e.g. pg.add_categories(net, "pipe", "material", ["pe"]) before net.pipe.loc[0, "material"] = "pe"
+
+    The create_* methods add the categories they need, only the direct edits of the tables need this.
+
+    :param net: the given network
+    :param table: the name of the table
+    :param col: the name of the categorical column
+    :param values: the values that will be assigned, the ones already allowed being ignored
+    :return:
+    """
+    try:
+        assert table in net.keys and SCHEMAS[table].get(col) == "category"
+    except AssertionError:
+        msg = "The column {} of the table {} is not a categorical column !".format(col, table)
+        logging.error(msg)
+        raise ValueError(msg)
+    _add_categories(getattr(net, table), col, values)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the binary save/load of networks and results.
+
+    A network is saved as a directory holding one .npy file per column of each element and result table, and a
+    meta.json file giving the tables, their columns and the dtype of each column. The .npy files can be memory-mapped
+    on load, so big networks and result sets are only read from disk when they are used.
+
+    Usage:
+
+    >>> import pandangas as pg
+
+    >>> pg.save_network(net, "district")
+    >>> net = pg.load_network("district", mmap=True)
+
+    >>> res = pg.runpp_timeseries(net, profiles)
+    >>> pg.save_results(res, "district_2020")
+    >>> res = pg.load_results("district_2020", mmap=True)
+    >>> res["p_Pa"][:, 42]  # only the pages holding this column are read
+
+"""
+
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+import pandangas.core as core
+
+
+FORMAT_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)  # version 1 has no categorical columns
+META_FILE = "meta.json"
+
+# the attributes of a network saved with its tables, see core._Network
+SETTINGS = ("LEVELS", "LHV", "V_MAX", "FRICTION", "RE_BLEND")
+
+
+def _column_kind(values):
+    """
+    The dtype a column is saved with: "category", "bool", "str" or a numeric numpy dtype, object columns being checked
+    value by value
+
+    :param values: the values of the column
+    :return: the name of the dtype
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return "category"
+    if values.dtype.kind in "biuf":
+        return values.dtype.name
+    not_null = [v for v, n in zip(values, pd.isnull(values)) if not n]
+    if not_null and all(isinstance(v, (bool, np.bool_)) for v in not_null):
+        return "bool"  # with a null mask if some values are missing
+    if not_null and all(isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, (bool, np.bool_))
+                        for v in not_null):
+        return "float64"
+    return "str"
+
+
+def _categories_kind(table, col, categories):
+    """
+    The dtype the categories of a categorical column are saved with, see _column_kind, raise ValueError and log an
+    error if they mix strings and other values, which could not be loaded back
+
+    :param table: the name of the table
+    :param col: the name of the column
+    :param categories: the categories of the column
+    :return: the name of the dtype
+    """
+    kind = _column_kind(categories.values)
+    try:
+        assert kind != "str" or all(isinstance(v, str) for v in categories)
+    except AssertionError:
+        msg = "The categories {} of the column {} of the table {} mix strings and other values !".format(
+            list(categories), col, table)
+        logging.error(msg)
+        raise ValueError(msg)
+    return kind
+
+
+def _save_array(path, file, arr):
+    np.save(os.path.join(path, file), arr, allow_pickle=False)
+    return file
+
+
+def _load_array(path, file, mmap):
+    return np.load(os.path.join(path, file), mmap_mode="c" if mmap else None, allow_pickle=False)
+
+
+def _save_table(path, table, df):
+    """
+    Save the columns and index of a table as .npy files
+
+    :param path: the directory
+    :param table: the name of the table
+    :param df: the table
+    :return: the description of the table for meta.json
+    """
+    columns = []
+    for i, col in enumerate(df.columns):
+        values = df[col].values
+        kind = _column_kind(values)
+        desc = {"name": col, "dtype": kind}
+        if kind == "category":
+            # the codes (-1 for null) and the categories, saved with their own dtype
+            arr = values.codes
+            desc["categories_dtype"] = _categories_kind(table, col, values.categories)
+            desc["categories"] = _save_array(path, "{}.{}.cat.npy".format(table, i), np.asarray(
+                values.categories.values, dtype=str if desc["categories_dtype"] == "str" else desc["categories_dtype"]))
+        elif kind == "str":
+            null = pd.isnull(values)
+            arr = np.array(["" if n else str(v) for v, n in zip(values, null)], dtype=str)
+            if null.any():
+                desc["null"] = _save_array(path, "{}.{}.null.npy".format(table, i), null)
+        elif kind == "bool" and values.dtype == object:
+            null = pd.isnull(values)
+            arr = np.array([not n and bool(v) for v, n in zip(values, null)], dtype=bool)
+            if null.any():
+                desc["null"] = _save_array(path, "{}.{}.null.npy".format(table, i), null)
+        else:
+            arr = np.asarray(values, dtype=np.float64 if kind == "float64" else kind)
+        desc["file"] = _save_array(path, "{}.{}.npy".format(table, i), arr)
+        columns.append(desc)
+
+    index = df.index.values
+    index_kind = "int64" if index.dtype.kind in "iu" or len(index) == 0 else "str"
+    index_file = _save_array(path, "{}.index.npy".format(table), np.asarray(index, dtype=index_kind))
+    return {"columns": columns, "index": {"dtype": index_kind, "file": index_file}}
+
+
+def _load_table(path, desc, mmap):
+    """
+    Load a table saved by _save_table
+
+    :param path: the directory
+    :param desc: the description of the table in meta.json
+    :param mmap: if True, memory-map the numeric columns
+    :return: the table
+    """
+    data = {}
+    for col in desc["columns"]:
+        arr = _load_array(path, col["file"], mmap and col["dtype"] not in ("str", "category") and "null" not in col)
+        if col["dtype"] == "category":
+            categories = _load_array(path, col["categories"], False)
+            if col.get("categories_dtype", "str") == "str":  # older files only have strings
+                categories = categories.astype(object)
+            arr = pd.Categorical.from_codes(arr, categories)
+        elif col["dtype"] == "str" or "null" in col:
+            # str columns and bool columns with missing values, null being None
+            arr = arr.astype(object)
+            if "null" in col:
+                arr[_load_array(path, col["null"], False)] = None
+        data[col["name"]] = arr
+
+    index = _load_array(path, desc["index"]["file"], False)
+    if desc["index"]["dtype"] == "str":
+        index = index.astype(object)
+    return pd.DataFrame(data, index=index, columns=[col["name"] for col in desc["columns"]], copy=False)
+
+
+def _check_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    try:
+        assert meta.get("version") in SUPPORTED_VERSIONS
+    except AssertionError:
+        msg = "The file {} is not a pandangas file of version {} !".format(path, SUPPORTED_VERSIONS)
+        logging.error(msg)
+        raise ValueError(msg)
+    return meta
+
+
+def save_network(net, path):
+    """
+    Save a given network and its results in a directory, one .npy file per column of each table, the settings of the
+    network (see SETTINGS) being written in meta.json
+
+    :param net: the given network
+    :param path: the directory, created if it does not exist
+    :return:
+    """
+    os.makedirs(path, exist_ok=True)
+    tables = {table: _save_table(path, table, getattr(net, table)) for table in sorted(net.keys)}
+    settings = {key: getattr(net, key) for key in SETTINGS}
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "kind": "network", "settings": settings, "tables": tables}, f, indent=1)
+
+
+def load_network(path, mmap=False):
+    """
+    Load a network saved by save_network
+
+    :param path: the directory
+    :param mmap: if True, memory-map the numeric columns instead of reading them, edits being kept in memory
+    (copy-on-write) and never written to the files (default: False)
+    :return: the network, its tables typed as in core.SCHEMAS
+    """
+    meta = _check_meta(path)
+    net = core.create_empty_network()
+    for key, value in meta.get("settings", {}).items():  # older files have no settings
+        setattr(net, key, tuple(value) if isinstance(value, list) else value)
+    for table, desc in meta["tables"].items():
+        df = _load_table(path, desc, mmap)
+        setattr(net, table, core._typed(table, df) if table in core.SCHEMAS else df)
+    core._rebuild_name_index(net)
+    return net
+
+
+def save_results(results, path):
+    """
+    Save a dict of arrays, as given by runpp_timeseries or run_scenarios, in a directory, one .npy file per array
+
+    :param results: the dict of numeric arrays
+    :param path: the directory, created if it does not exist
+    :return:
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = {key: _save_array(path, "res.{}.npy".format(i), np.asarray(arr))
+              for i, (key, arr) in enumerate(results.items())}
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump({"version": FORMAT_VERSION, "kind": "results", "arrays": arrays}, f, indent=1)
+
+
+def load_results(path, mmap=False):
+    """
+    Load a dict of arrays saved by save_results
+
+    :param path: the directory
+    :param mmap: if True, memory-map the arrays instead of reading them (default: False)
+    :return: the dict of arrays
+    """
+    meta = _check_meta(path)
+    return {key: _load_array(path, file, mmap) for key, file in meta["arrays"].items()}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the pressure drop in the pipes: Darcy friction factor correlations and their derivatives, in
+    NumPy only so the residual and the Jacobian of the model are evaluated at array speed.
+
+    Usage:
+
+    >>> import pandangas.friction as fr
+
+    >>> dp, ddp = fr.dp_from_m_dot(m_dot, l, d, e, rho, mu, correlation="haaland")
+
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import fluids
+
+
+LAMINAR_TRANSITION = 2040.0  # same as fluids.friction.LAMINAR_TRANSITION_PIPE
+CORRELATIONS = ("clamond", "swamee_jain", "haaland")
+
+LN10 = math.log(10)
+
+# the gas properties and friction model needed by dp_from_m_dot
+Fluid = namedtuple("Fluid", ["rho", "mu", "correlation", "blend"])
+
+
+@lru_cache(maxsize=None)
+def material_roughness(material):
+    """
+    Absolute roughness of a pipe material, computed once per material by fluids
+
+    :param material: the name of the material
+    :return: the roughness (in [m])
+    """
+    return fluids.material_roughness(material)
+
+
+def _clamond(re, ed):
+    """
+    Solution of the Colebrook equation by Clamond's method, as fluids.friction.Clamond, and its derivative by
+    differentiating the Colebrook equation implicitly: s = 1/sqrt(f), s = -2.log10(ed/3.7 + 2.51.s/Re)
+    """
+    x1 = ed * re * 0.1239681863354175460160858261654858382699
+    x2 = np.log(re) - 0.7793974884556819406441139701653776731705
+    f = x2 - 0.2
+    x1f = x1 + f
+    x1f1 = 1. + x1f
+    e = (np.log(x1f) - 0.2) / x1f1
+    f = f - (x1f1 + 0.5*e)*e*x1f / (x1f1 + e*(1. + 1.0/3.0*e))
+    x1f = x1 + f
+    x1f1 = 1. + x1f
+    e = (np.log(x1f) + f - x2) / x1f1
+    f = f - (x1f1 + 0.5*e)*e*x1f / (x1f1 + e*(1. + 1.0/3.0*e))
+    fd = 1.325474527619599502640416597148504422899 / (f*f)
+
+    s = 1 / np.sqrt(fd)
+    k = 2*2.51 / (LN10 * re * (ed/3.7 + 2.51*s/re))
+    return fd, -2 * fd * k / (1 + k)
+
+
+def _swamee_jain(re, ed):
+    c = ed/3.7 + 5.74 * re**-0.9
+    lg = np.log10(c)
+    return 0.25 / lg**2, 0.45 * 5.74 * re**-0.9 / (LN10 * lg**3 * c)
+
+
+def _haaland(re, ed):
+    c = (ed/3.7)**1.11 + 6.9/re
+    lg = np.log10(c)
+    return 1 / (3.24 * lg**2), 2 * 6.9 / (3.24 * LN10 * lg**3 * re * c)
+
+
+_TURBULENT = {"clamond": _clamond, "swamee_jain": _swamee_jain, "haaland": _haaland}
+
+
+def _blend_weight(re, blend):
+    """
+    Weight of the turbulent friction factor: 0 under blend[0], 1 over blend[1], and a smoothstep of log(Re) in between
+    (continuous derivative)
+
+    :return: the weight and Re * d(weight)/d(Re)
+    """
+    lo, hi = math.log(blend[0]), math.log(blend[1])
+    t = np.clip((np.log(np.maximum(re, 1E-300)) - lo) / (hi - lo), 0, 1)
+    return t*t*(3 - 2*t), 6*t*(1 - t) / (hi - lo)
+
+
+def friction_factor(re, ed, correlation="clamond"):
+    """
+    Darcy friction factor of turbulent flows given by a correlation, for Re > 0
+
+    :param re: Reynolds numbers
+    :param ed: relative roughness of the pipes
+    :param correlation: "clamond" (exact solution of Colebrook), "swamee_jain" or "haaland" (default: "clamond")
+    :return: the friction factors and Re * d(f)/d(Re)
+    """
+    return _TURBULENT[correlation](np.asarray(re, dtype=float), np.asarray(ed, dtype=float))
+
+
+def dp_from_m_dot(m_dot, l, d, e, rho, mu, correlation="clamond", blend=None):
+    """
+    Pressure drop in pipes and its derivative with respect to the mass flow
+
+    The flow is laminar (Hagen-Poiseuille, fd = 64/Re) under Re 2040 and turbulent (fd given by the correlation) over
+    it, as in fluids.friction_factor, or if blend = (Re_min, Re_max) a smooth mix of both between Re_min and Re_max,
+    so the derivative is continuous. The pressure drop has the sign of the mass flow.
+
+    :param m_dot: mass flows in the pipes (in [kg/s])
+    :param l: lengths of the pipes (in [m])
+    :param d: inner diameters of the pipes (in [m])
+    :param e: absolute roughness of the pipes (in [m])
+    :param rho: density of the gas (in [kg/m3])
+    :param mu: dynamic viscosity of the gas (in [Pa.s])
+    :param correlation: the friction factor of turbulent flows, see friction_factor (default: "clamond")
+    :param blend: None for a switch at Re 2040, or the Reynolds numbers (Re_min, Re_max) of the blend (default: None)
+    :return: the pressure drops (in [Pa]) and their derivatives (in [Pa.s/kg])
+    """
+    m_dot, l, d, e = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (m_dot, l, d, e)))
+    a = math.pi * (d/2)**2
+    v = m_dot / a / rho
+    re = rho * np.abs(v) * d / mu
+
+    dp_lam = 32 * mu * l * v / d**2
+    ddp_lam = 32 * mu * l / d**2 / a / rho
+    if blend is None:
+        turb = re >= LAMINAR_TRANSITION
+    else:
+        turb = re > blend[0]
+
+    dp = np.array(dp_lam)
+    ddp = np.array(ddp_lam)
+    if turb.any():
+        re_t, v_t, k_t = re[turb], v[turb], l[turb] / d[turb] * rho / 2
+        fd, re_dfd = friction_factor(re_t, e[turb] / d[turb], correlation)
+        dp_t = k_t * fd * v_t * np.abs(v_t)
+        ddp_t = k_t * np.abs(v_t) * (2*fd + re_dfd) / a[turb] / rho
+        if blend is not None:
+            w, re_dw = _blend_weight(re_t, blend)
+            dp_t, ddp_t = (w*dp_t + (1 - w)*dp_lam[turb],
+                           w*ddp_t + (1 - w)*ddp_lam[turb] + re_dw / np.abs(m_dot[turb]) * np.sign(m_dot[turb]) *
+                           (dp_t - dp_lam[turb]))
+        dp[turb] = dp_t
+        ddp[turb] = ddp_t
+    return dp, ddp
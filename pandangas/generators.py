@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Synthetic networks of configurable size, for tests and benchmarks.
+
+    Usage:
+
+    >>> import pandangas.generators as gen
+
+    >>> net = gen.create_radial_network(1000)
+    >>> net = gen.create_grid_network(30, 30)
+    >>> net = gen.create_multi_level_network(10, 100, district="grid")
+
+"""
+
+import numpy as np
+
+import pandangas.core as core
+
+
+def _names(prefix, kind, ids):
+    return ["{}{}{}".format(prefix, kind, i) for i in ids]
+
+
+def _add_radial(net, n_bus, level, prefix, branching, length_m, diameter_m, p_kW):
+    """
+    Add a radial district to a given network: bus i is linked to bus (i - 1) // branching, and every bus but the first
+    one has a load
+
+    :return: the name of the first bus
+    """
+    buses = core.create_buses(net, level=level, name=_names(prefix, "BUS", range(n_bus)))
+    ids = np.arange(1, n_bus)
+    core.create_pipes(net, [buses[i] for i in (ids - 1) // branching], buses[1:], length_m=length_m,
+                      diameter_m=diameter_m, name=_names(prefix, "PIPE", ids))
+    core.create_loads(net, buses[1:], p_kW=p_kW, name=_names(prefix, "LOAD", ids))
+    return buses[0]
+
+
+def _add_grid(net, n_rows, n_cols, level, prefix, length_m, diameter_m, p_kW):
+    """
+    Add a grid-meshed district to a given network: bus i * n_cols + j is linked to its right and lower neighbours, and
+    every bus but the first one has a load
+
+    :return: the name of the first bus
+    """
+    buses = core.create_buses(net, level=level, name=_names(prefix, "BUS", range(n_rows * n_cols)))
+    grid = np.arange(n_rows * n_cols).reshape(n_rows, n_cols)
+    from_ids = np.concatenate((grid[:, :-1].ravel(), grid[:-1, :].ravel()))
+    to_ids = np.concatenate((grid[:, 1:].ravel(), grid[1:, :].ravel()))
+    core.create_pipes(net, [buses[i] for i in from_ids], [buses[i] for i in to_ids], length_m=length_m,
+                      diameter_m=diameter_m, name=_names(prefix, "PIPE", range(len(from_ids))))
+    core.create_loads(net, buses[1:], p_kW=p_kW, name=_names(prefix, "LOAD", range(1, len(buses))))
+    return buses[0]
+
+
+def create_radial_network(n_bus, level="BP", branching=3, length_m=50.0, diameter_m=0.1, p_kW=1.0):
+    """
+    Create a radial (tree) network fed by a feeder on its first bus
+
+    :param n_bus: number of buses
+    :param level: pressure level of the buses (default: "BP")
+    :param branching: number of pipes leaving each bus (default: 3)
+    :param length_m: length of the pipes (in [m], default: 50)
+    :param diameter_m: inner diameter of the pipes (in [m], default: 0.1)
+    :param p_kW: power consumed by the load of each bus (in [kW], default: 1)
+    :return: the network
+    """
+    net = core.create_empty_network()
+    root = _add_radial(net, n_bus, level, "", branching, length_m, diameter_m, p_kW)
+    core.create_feeder(net, root, p_lim_kW=n_bus * p_kW, p_Pa=net.LEVELS[level], name="FEEDER")
+    return net
+
+
+def create_grid_network(n_rows, n_cols, level="BP", length_m=50.0, diameter_m=0.1, p_kW=1.0):
+    """
+    Create a grid-meshed network fed by a feeder on a corner bus
+
+    :param n_rows: number of rows of buses
+    :param n_cols: number of columns of buses
+    :param level: pressure level of the buses (default: "BP")
+    :param length_m: length of the pipes (in [m], default: 50)
+    :param diameter_m: inner diameter of the pipes (in [m], default: 0.1)
+    :param p_kW: power consumed by the load of each bus (in [kW], default: 1)
+    :return: the network
+    """
+    net = core.create_empty_network()
+    root = _add_grid(net, n_rows, n_cols, level, "", length_m, diameter_m, p_kW)
+    core.create_feeder(net, root, p_lim_kW=n_rows * n_cols * p_kW, p_Pa=net.LEVELS[level], name="FEEDER")
+    return net
+
+
+def create_multi_level_network(n_districts, n_bus_per_district, district="radial", length_m=50.0, diameter_m=0.1,
+                               p_kW=1.0):
+    """
+    Create a MP line fed by a feeder, with a station on each of its buses feeding a BP district
+
+    :param n_districts: number of BP districts
+    :param n_bus_per_district: number of buses of each district (rounded down to a square for grid districts)
+    :param district: "radial" or "grid" (default: "radial")
+    :param length_m: length of the pipes (in [m], default: 50)
+    :param diameter_m: inner diameter of the pipes (in [m], default: 0.1)
+    :param p_kW: power consumed by the load of each BP bus (in [kW], default: 1)
+    :return: the network
+    """
+    net = core.create_empty_network()
+    mp_buses = core.create_buses(net, level="MP", name=_names("MP_", "BUS", range(n_districts + 1)))
+    core.create_pipes(net, mp_buses[:-1], mp_buses[1:], length_m=length_m * 10, diameter_m=diameter_m * 2,
+                      name=_names("MP_", "PIPE", range(n_districts)))
+
+    roots = []
+    for d in range(n_districts):
+        prefix = "D{}_".format(d)
+        if district == "grid":
+            side = max(int(np.sqrt(n_bus_per_district)), 1)
+            roots.append(_add_grid(net, side, side, "BP", prefix, length_m, diameter_m, p_kW))
+        else:
+            roots.append(_add_radial(net, n_bus_per_district, "BP", prefix, 3, length_m, diameter_m, p_kW))
+
+    p_lim_kW = n_bus_per_district * p_kW
+    core.create_stations(net, mp_buses[1:], roots, p_lim_kW=p_lim_kW, p_Pa=net.LEVELS["BP"],
+                         name=_names("", "STATION", range(n_districts)))
+    core.create_feeder(net, mp_buses[0], p_lim_kW=n_districts * p_lim_kW, p_Pa=net.LEVELS["MP"], name="FEEDER")
+    return net
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the compiled simulation model, solved many times with new load and feeder values.
+
+    The levels of the network are compiled once (incidence matrices, pipe arrays, gas properties, index maps), then
+    each solve only builds the load and pressure vectors and runs the solver from the previous solution. The network
+    itself is not read nor modified by the solves.
+
+    Usage:
+
+    >>> import pandangas as pg
+
+    >>> model = pg.compile_model(net)
+    >>> res = model.solve(loads={"LOAD2": 12.0})  # p_kW of LOAD2, the other loads keep the values of the network
+    >>> res = model.solve(loads=p_kw, p_feed=[0.9E5])  # one value per load and per feeder, in the table order
+    >>> res["p_Pa"]  # one value per bus
+
+"""
+
+import logging
+
+import numpy as np
+
+import pandangas.simulation as sim
+
+
+def _vector(values, names, base, what):
+    """
+    Vector of values aligned on the rows of a table
+
+    :param values: None, a dict {name: value} updating the base values, or one value per row
+    :param names: the names of the rows
+    :param base: the values used if None or for the names missing from the dict
+    :param what: the name of the values, for the error messages
+    :return: a new array of float
+    """
+    vec = np.array(base, dtype=float)
+    if values is None:
+        return vec
+
+    if isinstance(values, dict):
+        pos = {name: i for i, name in enumerate(names)}
+        unknown = [name for name in values if name not in pos]
+        try:
+            assert not unknown
+        except AssertionError:
+            msg = "The elements {} of {} do not exist !".format(unknown, what)
+            logging.error(msg)
+            raise ValueError(msg)
+        vec[[pos[name] for name in values]] = list(values.values())
+        return vec
+
+    values = np.asarray(values, dtype=float)
+    try:
+        assert values.shape == vec.shape
+    except AssertionError:
+        msg = "{} values are expected for {}, not {}".format(len(vec), what, values.shape)
+        logging.error(msg)
+        raise ValueError(msg)
+    return values
+
+
+class Model:
+    """
+    The levels of a network compiled once for many solves, see compile_model
+
+    The solutions are given as arrays following the row order of the tables of the network, as runpp_timeseries:
+    "p_Pa" (one value per bus), "m_dot_pipe", "m_dot_feeder" and "m_dot_station" (one value per pipe, feeder or
+    station, in [kg/s], same signs as the res_* tables).
+
+    A model can be pickled, e.g. to be sent to the worker processes of an optimization.
+    """
+
+    def __init__(self, net, t_grnd=10+273.15, solver="fsolve", solver_options=None):
+
+        # the thermo Chemical of each level is not kept: the solves only need its fluid, and it cannot be pickled
+        self.levels = {level: {key: value for key, value in lev.items() if key != "gas"}
+                       for level, lev in sim._compile_levels(net, t_grnd).items()}
+        self.solver = solver
+        self.solver_options = solver_options
+        self.LHV = net.LHV
+
+        self.load_names = net.load["name"].tolist()
+        self.feeder_names = net.feeder["name"].tolist()
+        self.p_kW = (net.load["p_kW"].values * net.load["scaling"].values).astype(float)
+        self.p_feed = net.feeder["p_Pa"].values.astype(float)
+        self.p_stations = net.station["p_Pa"].values.astype(float)
+        self.n_bus, self.n_pipe = len(net.bus.index), len(net.pipe.index)
+        self.n_feeder, self.n_station = len(self.feeder_names), len(net.station.index)
+
+        # the statistics of the last solve of each level (see simulation._solve) and its solution, the next initial
+        # guess
+        self.info = {}
+        self.x = {level: sim._init_variables(lev, net.LEVELS[level]) for level, lev in self.levels.items()}
+
+    def __repr__(self):
+        return "Model of {} buses and {} pipes, levels {}, solver {}".format(
+            self.n_bus, self.n_pipe, list(self.levels), self.solver)
+
+    def solve_m_dot(self, m_dot_loads, p_feed):
+        """
+        Solve the model for the mass flows of the loads and the pressures of the feeders, without any check
+
+        :param m_dot_loads: mass flows consumed by the loads, one per load (in [kg/s])
+        :param p_feed: pressures of the feeders, one per feeder (in [Pa])
+        :return: a dict of arrays, see Model
+        """
+        res = {
+            "p_Pa": np.zeros(self.n_bus),
+            "m_dot_pipe": np.zeros(self.n_pipe),
+            "m_dot_feeder": np.zeros(self.n_feeder),
+            "m_dot_station": np.zeros(self.n_station),
+        }
+        m_dot_stations = res["m_dot_station"]
+        for level, lev in self.levels.items():
+            m_dot_load = lev["load_mat"] @ m_dot_loads + lev["stat_load_mat"] @ m_dot_stations
+            p_level = lev["feeder_mat"] @ p_feed + lev["stat_feed_mat"] @ self.p_stations
+
+            args = sim._level_args(lev) + (lev["idx_load"], m_dot_load, lev["idx_feed"], p_level)
+            x, self.info[level] = sim._solve_level(lev, args, self.x[level], self.solver,
+                                                   options=self.solver_options)
+            self.x[level] = x
+
+            n_nodes, n_pipes = lev["i_mat"].shape
+            m_dot_nodes = x[n_nodes+n_pipes:]
+            res["p_Pa"][lev["bus_pos"]] = x[:n_nodes]
+            res["m_dot_pipe"][lev["pipe_pos"]] = x[n_nodes:n_nodes+n_pipes]
+
+            feed = lev["feeder_nodes"] >= 0
+            res["m_dot_feeder"][feed] = m_dot_nodes[lev["feeder_nodes"][feed]]
+            stat = lev["stat_nodes"] >= 0
+            m_dot_stations[stat] = -m_dot_nodes[lev["stat_nodes"][stat]]
+        return res
+
+    def solve(self, loads=None, p_feed=None):
+        """
+        Solve the model for new load powers and feeder pressures, starting from the previous solution
+
+        :param loads: the powers consumed by the loads (in [kW], scaling included): a dict {load name: value}, the
+        other loads keeping the values of the network, or one value per load in the row order of the load table, or
+        None for the values of the network (default: None)
+        :param p_feed: the pressures of the feeders (in [Pa]), as a dict {feeder name: value}, one value per feeder or
+        None, as loads (default: None)
+        :return: a dict of arrays, see Model
+        """
+        p_kw = _vector(loads, self.load_names, self.p_kW, "load")
+        p_feed = _vector(p_feed, self.feeder_names, self.p_feed, "feeder")
+        return self.solve_m_dot(p_kw / self.LHV, p_feed)  # kW to kg/s
+
+
+def compile_model(net, t_grnd=10+273.15, solver="fsolve", solver_options=None):
+    """
+    Compile a given network into a model solved many times with new load and feeder values, e.g. in optimization or
+    co-simulation loops
+
+    The model keeps the buses, pipes, stations, gas properties and nominal station pressures of the network at the
+    time of the compilation: compile it again after editing them.
+
+    :param net: the given network
+    :param t_grnd: temperature of the ground, used for the gas properties (in [K], default: 10°C)
+    :param solver: the solver, see runpp (default: "fsolve")
+    :param solver_options: the options of the solver, see runpp (default: None)
+    :return: the model, see Model
+    """
+    return Model(net, t_grnd, solver, solver_options)
@@ -17,64 +17,177 @@
 from math import pi
 import operator
 import logging
+import time
 
+import numpy as np
+import pandas as pd
+
+import pandangas.core as core
 import pandangas.simulation as sim
-from pandangas.utilities import get_index
 
 
-def _v_from_m_dot(net, pipe, m_dot, fluid):
+def _v_from_m_dot_vec(m_dot, d, fluid):
     q = m_dot / fluid.rho
-    idx = net.pipe.index[net.pipe["name"] == pipe].tolist()[0]
-    a = pi * (net.pipe.at[idx, "diameter_m"])**2 / 4
+    a = pi * d**2 / 4
     return q / a
 
 
-def runpp(net, t_grnd=10+273.15):
-
-    net.res_bus.drop(net.res_bus.index, inplace=True)
-    net.res_pipe.drop(net.res_pipe.index, inplace=True)
-    net.res_feeder.drop(net.res_feeder.index, inplace=True)
-    net.res_station.drop(net.res_station.index, inplace=True)
-
-    for pipe in net.pipe.loc[net.pipe["in_service"] == False, "name"].values:
-        idx = get_index(pipe, net.pipe)
-        net.res_pipe.loc[idx] = [pipe, 0.0, 0.0, 0.0, 0]
+def _level_results(net, lev, p_nodes, m_dot_pipes, m_dot_nodes):
+    """
+    Build the rows of the results tables for a solved pressure level
+
+    :param net: the given network
+    :param lev: the compiled level
+    :param p_nodes: the pressures of the nodes of the level (in [Pa])
+    :param m_dot_pipes: the mass flows of the pipes of the level (in [kg/s])
+    :param m_dot_nodes: the mass flows of the nodes of the level (in [kg/s])
+    :return: the rows of res_bus, res_pipe, res_feeder, res_station and res_load as DataFrames
+    """
+    res_bus = pd.DataFrame(
+        {"name": lev["nodes"], "p_Pa": p_nodes, "p_bar": np.round(p_nodes*1E-5, 2)},
+        index=net.bus.index[lev["bus_pos"]], columns=net.res_bus.columns)
+
+    v = _v_from_m_dot_vec(m_dot_pipes, lev["diam"], lev["fluid"])
+    res_pipe = pd.DataFrame(
+        {"name": lev["pipes"], "m_dot_kg/s": m_dot_pipes, "v_m/s": v, "p_kW": m_dot_pipes * net.LHV,
+         "loading_%": np.round(np.abs(100*v/net.V_MAX), 1)},
+        index=net.pipe.index[lev["pipe_pos"]], columns=net.res_pipe.columns)
+
+    feed = np.flatnonzero(lev["feeder_nodes"] >= 0)
+    m_dot = m_dot_nodes[lev["feeder_nodes"][feed]]
+    p_lim = net.feeder["p_lim_kW"].values[feed].astype(float)
+    res_feeder = pd.DataFrame(
+        {"name": net.feeder["name"].values[feed], "m_dot_kg/s": m_dot, "p_kW": m_dot * net.LHV,
+         "loading_%": np.round(np.abs(100*m_dot*net.LHV/p_lim), 1)},
+        index=net.feeder.index[feed], columns=net.res_feeder.columns)
+
+    stat = np.flatnonzero(lev["stat_nodes"] >= 0)
+    m_dot = -m_dot_nodes[lev["stat_nodes"][stat]]
+    p_lim = net.station["p_lim_kW"].values[stat].astype(float)
+    res_station = pd.DataFrame(
+        {"name": net.station["name"].values[stat], "m_dot_kg/s": m_dot, "p_kW": m_dot * net.LHV,
+         "loading_%": np.round(np.abs(100*m_dot*net.LHV/p_lim), 1)},
+        index=net.station.index[stat], columns=net.res_station.columns)
+
+    load = np.flatnonzero(lev["load_nodes"] >= 0)
+    p_load = p_nodes[lev["load_nodes"][load]]
+    p_kw = net.load["p_kW"].values[load] * net.load["scaling"].values[load]
+    res_load = pd.DataFrame(
+        {"name": net.load["name"].values[load], "p_Pa": p_load, "m_dot_kg/s": np.round(p_kw / net.LHV, 6),
+         "p_kW": p_kw, "p_ok": p_load >= net.load["min_p_Pa"].values[load]},
+        index=net.load.index[load], columns=net.res_load.columns)
+
+    return res_bus, res_pipe, res_feeder, res_station, res_load
+
+
+INITS = ("flat", "results")
+
+
+def iter_runpp(net, t_grnd=10+273.15, solver="fsolve", init="flat", use_cache=False, executor=None,
+               solver_options=None):
+    """
+    Compute the pressures and mass flows of a given network level by level, as runpp, yielding the results of each
+    level as soon as it is solved
+
+    The results tables of the network are only written once the generator is exhausted. If it is closed before, the
+    levels already solved are not written, and net.res_station is restored, as when a level fails.
+
+    :param net: the given network
+    :param t_grnd: temperature of the ground, used for the gas properties (in [K], default: 10°C)
+    :param solver: the solver, see runpp (default: "fsolve")
+    :param init: "flat" or "results", see runpp (default: "flat")
+    :param use_cache: if True, reuse the results of the unchanged levels, see runpp (default: False)
+    :param executor: an executor to solve the connected components of each level in parallel, see runpp (default: None)
+    :param solver_options: the options of the solver, see runpp (default: None)
+    :return: a generator of dicts, one per level by increasing pressure, with the name of the level ("level"), its
+    rows of the res_bus, res_pipe, res_feeder, res_station and res_load tables, and its statistics ("stats", see
+    net.res_stats)
+    """
+    try:
+        assert init in INITS
+    except AssertionError:
+        msg = "The initialization {} is not in {}".format(init, INITS)
+        logging.error(msg)
+        raise ValueError(msg)
+
+    prev = (net.res_bus.copy(), net.res_pipe.copy()) if init == "results" else None
+    prev_station = net.res_station
+
+    out_of_service = net.pipe.loc[net.pipe["in_service"] == False]
+    res = {
+        "res_bus": [],
+        "res_pipe": [pd.DataFrame({"name": out_of_service["name"], "m_dot_kg/s": 0.0, "v_m/s": 0.0, "p_kW": 0.0,
+                                   "loading_%": 0}, columns=net.res_pipe.columns)],
+        "res_feeder": [],
+        "res_load": [],
+    }
+    net.res_station = core._empty_table("res_station")
+    stats = []
 
     sorted_levels = sorted(net.LEVELS.items(), key=operator.itemgetter(1))
-    for level, value in sorted_levels:
-        if level in net.bus["level"].unique():
-            logging.info("Compute level {}".format(level))
-            p_nodes, m_dot_pipes, m_dot_nodes, fluid = sim._run_sim(net, level, t_grnd)
-
-            for node, value in p_nodes.items():
-                if node in net.bus["name"].unique():
-                    idx = get_index(node, net.bus)
-                    net.res_bus.loc[idx] = [node, value, round(value*1E-5, 2)]
-
-            for pipe, m_dot in m_dot_pipes.items():
-                idx = get_index(pipe, net.pipe)
-                v = _v_from_m_dot(net, pipe, m_dot, fluid)
-                net.res_pipe.loc[idx] = [pipe, m_dot, v, m_dot * net.LHV, round(abs(100*v/net.V_MAX), 1)]
-
-            for node, m_dot in m_dot_nodes.items():
-                if node in net.station["bus_low"].unique():
-                    idx_stat = get_index(node, net.station, col="bus_low")
-                    stat = net.station.at[idx_stat, "name"]
-                    idx = get_index(stat, net.res_station)
-                    net.res_station.loc[idx] = [
-                        stat,
-                        -m_dot,
-                        -m_dot * net.LHV,
-                        round(abs(-100*m_dot*net.LHV/net.station.at[idx_stat, "p_lim_kW"]), 1)
-                    ]
-
-                if node in net.feeder["bus"].unique():
-                    idx_feed = get_index(node, net.feeder, col="bus")
-                    feed = net.feeder.at[idx_feed, "name"]
-                    idx = get_index(feed, net.res_feeder)
-                    net.res_feeder.loc[idx] = [
-                        feed,
-                        m_dot,
-                        m_dot * net.LHV,
-                        round(abs(100*m_dot*net.LHV/net.feeder.at[idx_feed, "p_lim_kW"]), 1)
-                    ]
+    bus_levels = set(net.bus["level"].unique())
+    try:
+        for level, value in sorted_levels:
+            if level in bus_levels:
+                logging.info("Compute level {}".format(level))
+                level_stats = {}
+                lev, p_nodes, m_dot_pipes, m_dot_nodes = sim._run_level(
+                    net, level, t_grnd, solver, prev, use_cache, executor, level_stats, solver_options)
+
+                start = time.perf_counter()
+                res_bus, res_pipe, res_feeder, res_station, res_load = _level_results(net, lev, p_nodes, m_dot_pipes,
+                                                                                      m_dot_nodes)
+                res["res_bus"].append(res_bus)
+                res["res_pipe"].append(res_pipe)
+                res["res_feeder"].append(res_feeder)
+                res["res_load"].append(res_load)
+
+                # the station flows are needed by the next levels
+                net.res_station = pd.concat([net.res_station, res_station]) if len(net.res_station.index) \
+                    else res_station
+
+                level_stats["results_s"] = time.perf_counter() - start
+                stats.append(level_stats)
+                yield {"level": level, "res_bus": res_bus, "res_pipe": res_pipe, "res_feeder": res_feeder,
+                       "res_station": res_station, "res_load": res_load, "stats": level_stats}
+    except BaseException:  # closed early, or a level failed
+        net.res_station = prev_station
+        raise
+
+    for tb, dfs in res.items():
+        dfs = [df for df in dfs if len(df.index) > 0]
+        setattr(net, tb, core._concat(tb, dfs) if dfs else core._empty_table(tb))
+    net.res_station = core._typed("res_station", net.res_station)
+    net.res_stats = core._typed("res_stats", pd.DataFrame(stats, columns=net.res_stats.columns))
+
+
+def runpp(net, t_grnd=10+273.15, solver="fsolve", init="flat", use_cache=False, executor=None, callback=None,
+          solver_options=None):
+    """
+    Compute the pressures and mass flows of a given network, level by level, and store them in the results tables
+
+    :param net: the given network
+    :param t_grnd: temperature of the ground, used for the gas properties (in [K], default: 10°C)
+    :param solver: "fsolve" for scipy's hybrid method, "hybr" or "lm" for scipy's hybrid or Levenberg-Marquardt
+    methods with the analytic Jacobian, "newton" for a Newton-Raphson method with a sparse analytic Jacobian, faster on
+    large networks, "krylov" for the same method with preconditioned GMRES steps, for the largest networks, or "loop"
+    for a Newton-Raphson method on the loop flows only, faster on weakly meshed networks (default: "fsolve")
+    :param init: "flat" to start from the nominal pressure of each level, or "results" to start from the results of
+    the previous runpp for the buses and pipes that still exist, faster after small edits of the network
+    (default: "flat")
+    :param use_cache: if True, a level is only solved again if its buses, pipes, stations, loads, feeders, the flows
+    of the stations it feeds or the gas settings of the network (LEVELS, LHV, FRICTION, RE_BLEND) changed since the
+    previous runpp; other edits, e.g. of the network attributes, are not seen (default: False)
+    :param executor: a concurrent.futures executor (thread or process pool); each level is split into its connected
+    components, solved as independent systems, in parallel on the executor if given (default: None)
+    :param solver_options: a dict with the tolerance "tol", the maximum number of iterations "max_iter" and, for
+    "krylov", the preconditioner "precond" of the solver, see simulation._solve, and "reduce" to solve the levels
+    without their load-free dead ends and with their series pipes merged, the results being given for every bus and
+    pipe, see simulation._reduce_topology (default: None)
+    :param callback: a function called with the statistics of each level (a dict, see net.res_stats) once its results
+    are computed, e.g. to report progress (default: None)
+    :return:
+    """
+    for level in iter_runpp(net, t_grnd, solver, init, use_cache, executor, solver_options):
+        if callback is not None:
+            callback(level["stats"])
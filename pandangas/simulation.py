@@ -11,28 +11,42 @@
 """
 
 import numpy as np
-import networkx as nx
+import pandas as pd
 import pandangas.topology as top
 
+import hashlib
+import inspect
 import logging
+import time
+import warnings
 
-from pandangas.utilities import get_index
-
-import math
-import fluids
-import fluids.vectorized as fvec
-from scipy.optimize import fsolve
+import pandangas.friction as fr
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import spsolve, spilu, gmres, LinearOperator
+from scipy.optimize import fsolve, root
 from thermo.chemical import Chemical
 
 
+# the relative tolerance of gmres is named tol before scipy 1.12
+_GMRES_RTOL = "rtol" if "rtol" in inspect.signature(gmres).parameters else "tol"
+
+
 def _scaled_loads_as_dict(net):
-    loads = {row[1]: round(row[2]*row[4]/net.LHV, 6) for _, row in net.load.iterrows()}  # kW to kg/s
-    stations = {}
-    for _, row in net.res_station.iterrows():
-        idx_stat = get_index(row[0], net.station)
-        stations[net.station.at[idx_stat, "bus_high"]] = round(row[1], 6)
-    loads.update(stations)
-    return loads
+    """
+    Mass flows consumed at the SINK buses of a given network: the sum of the loads of each bus, or the flow of the
+    station it feeds
+
+    :param net: the given network
+    :return: a dict {bus name: mass flow (in [kg/s])}
+    """
+    m_dot = net.load["p_kW"].values * net.load["scaling"].values / net.LHV  # kW to kg/s
+    loads = pd.Series(m_dot, dtype=float).groupby(net.load["bus"].values, sort=False).sum()
+
+    stat = top._positions(net.station["name"].values, net.res_station["name"].values)
+    bus_high = net.station["bus_high"].values[stat]
+    stations = pd.Series(net.res_station["m_dot_kg/s"].values, dtype=float).groupby(bus_high, sort=False).sum()
+    return loads.add(stations, fill_value=0).round(6).to_dict()
 
 
 def _p_nom_feed_as_dict(net):
@@ -43,78 +57,960 @@ def _p_nom_feed_as_dict(net):
 
 
 def _p_min_loads_as_dict(net):
-    return {row[1]: row[3] for _, row in net.load.iterrows()}
+    """
+    Minimum acceptable pressures at the buses of a given network with loads: the highest min_p_Pa of the loads of each
+    bus, so the pressure of a bus is acceptable for all its loads
+
+    :param net: the given network
+    :return: a dict {bus name: minimum pressure (in [Pa])}
+    """
+    return net.load.groupby("bus", sort=False)["min_p_Pa"].max().to_dict()
 
 
 def _i_mat(graph):
-    return np.asarray(nx.incidence_matrix(graph, oriented=True).todense())
+    """
+    Oriented node-pipe incidence matrix of a given graph, kept sparse so its size scales with the number of pipes
+
+    :param graph: the given graph
+    :return: the incidence matrix as a scipy.sparse CSR matrix
+    """
+    nodes = {n: i for i, n in enumerate(graph.nodes)}
+    edges = list(graph.edges())
+    return top.incidence_matrix(len(nodes), [nodes[u] for u, _ in edges], [nodes[v] for _, v in edges])
+
+
+def _friction_model(fluid):
+    return getattr(fluid, "correlation", "clamond"), getattr(fluid, "blend", None)
 
 
 def _dp_from_m_dot_vec(m_dot, l, d, e, fluid):
-    a = math.pi * (d/2)**2
-    v = m_dot / a / fluid.rho
-    re = fvec.core.Reynolds(v, d, fluid.rho, fluid.mu)
-    fd = fvec.friction_factor(re, eD=e/d)
-    k = fvec.K_from_f(fd=fd, L=l, D=d)
-    return fvec.dP_from_K(k, rho=fluid.rho, V=v)
+    """
+    Pressure drop in each pipe, see friction.dp_from_m_dot
+
+    :param m_dot: mass flows in the pipes (in [kg/s])
+    :param l: lengths of the pipes (in [m])
+    :param d: inner diameters of the pipes (in [m])
+    :param e: absolute roughness of the pipes (in [m])
+    :param fluid: the gas flowing in the pipes, a friction.Fluid or any object with rho and mu
+    :return: the pressure drops (in [Pa])
+    """
+    return fr.dp_from_m_dot(m_dot, l, d, e, fluid.rho, fluid.mu, *_friction_model(fluid))[0]
+
+
+def _ddp_dm_dot_vec(m_dot, l, d, e, fluid):
+    """
+    Derivative of the pressure drop given by _dp_from_m_dot_vec with respect to the mass flow of each pipe
+
+    :param m_dot: mass flows in the pipes (in [kg/s])
+    :param l: lengths of the pipes (in [m])
+    :param d: inner diameters of the pipes (in [m])
+    :param e: absolute roughness of the pipes (in [m])
+    :param fluid: the gas flowing in the pipes
+    :return: d(dP)/d(m_dot) for each pipe (in [Pa.s/kg])
+    """
+    return fr.dp_from_m_dot(m_dot, l, d, e, fluid.rho, fluid.mu, *_friction_model(fluid))[1]
 
 
 def _eq_m_dot_sum(m_dot_pipes, m_dot_nodes, i_mat):
-    return np.matmul(i_mat, m_dot_pipes) - m_dot_nodes
+    return i_mat @ m_dot_pipes - m_dot_nodes
+
+
+def _eq_pressure(p_nodes, m_dot_pipes, i_mat_t, l, d, e, fluid):
+    return i_mat_t @ p_nodes + _dp_from_m_dot_vec(m_dot_pipes, l, d, e, fluid)
 
 
-def _eq_pressure(p_nodes, m_dot_pipes, i_mat, l, d, e, fluid):
-    return np.matmul(p_nodes, i_mat) + _dp_from_m_dot_vec(m_dot_pipes, l, d, e, fluid)
+def _eq_m_dot_node(m_dot_nodes, idx_load, m_dot_load):
+    return m_dot_nodes[idx_load] - m_dot_load
 
 
-def _eq_m_dot_node(m_dot_nodes, gr, loads):
-    bus_load = np.array([m_dot_nodes[i] - loads[node]
-                         for i, (node, data) in enumerate(gr.nodes(data=True)) if data["type"] == "SINK"])
-    bus_node = np.array([m_dot_nodes[i]
-                         for i, (node, data) in enumerate(gr.nodes(data=True)) if data["type"] == "NODE"])
-    return np.concatenate((bus_load, bus_node))
+def _eq_p_feed(p_nodes, idx_feed, p_feed):
+    return p_nodes[idx_feed] - p_feed
 
 
-def _eq_p_feed(p_nodes, gr, p_nom):
-    p_feed = np.array([p_nodes[i] - p_nom[node]
-                       for i, (node, data) in enumerate(gr.nodes(data=True)) if data["type"] == "SRCE"])
-    return p_feed
+def _node_vectors(lev, loads, p_nom):
+    """
+    Index arrays of the constrained nodes of a compiled level, and the loads and pressures aligned on them
 
+    The SINK nodes come first then the NODE nodes (no load), as expected by _eq_m_dot_node.
 
-def _init_variables(gr, p_nom):
-    p_nodes_init = np.array([p_nom]*len(gr.nodes))
-    m_dot_pipes_init = np.array([0.002]*len(gr.edges))
-    m_dot_nodes_init = np.array([0.001]*len(gr.nodes))
+    :param lev: the compiled level
+    :param loads: mass flows consumed at the SINK nodes (in [kg/s]), as given by _scaled_loads_as_dict
+    :param p_nom: operating pressures of the SRCE nodes (in [Pa]), as given by _p_nom_feed_as_dict
+    :return: indexes of the SINK and NODE nodes, their mass flows, indexes of the SRCE nodes and their pressures
+    """
+    nodes = lev["nodes"]
+    types = lev["types"]
+
+    idx_sink = np.flatnonzero(types == "SINK")
+    idx_node = np.flatnonzero(types == "NODE")
+    idx_feed = np.flatnonzero(types == "SRCE")
+
+    idx_load = np.concatenate((idx_sink, idx_node))
+    m_dot_load = np.concatenate(([loads[nodes[i]] for i in idx_sink], np.zeros(len(idx_node))))
+    p_feed = np.array([p_nom[nodes[i]] for i in idx_feed], dtype=float)
+    return idx_load, m_dot_load, idx_feed, p_feed
+
+
+def _init_variables(lev, p_nom):
+    p_nodes_init = np.full(len(lev["nodes"]), p_nom, dtype=float)
+    m_dot_pipes_init = np.full(len(lev["pipes"]), 0.002)
+    m_dot_nodes_init = np.full(len(lev["nodes"]), 0.001)
+
+    return np.concatenate((p_nodes_init, m_dot_pipes_init, m_dot_nodes_init))
+
+
+def _init_variables_from_results(lev, p_nom, res_bus, res_pipe):
+    """
+    Initial guess of a compiled level seeded with the results of a previous simulation
+
+    The buses and pipes missing from the results get the same guess as _init_variables, and the mass flows of the
+    nodes are derived from the mass flows of the pipes.
+
+    :param lev: the compiled level
+    :param p_nom: nominal pressure of the level (in [Pa])
+    :param res_bus: the res_bus table of the previous simulation
+    :param res_pipe: the res_pipe table of the previous simulation
+    :return: the initial guess
+    """
+    res_bus = res_bus.drop_duplicates("name")
+    res_pipe = res_pipe.drop_duplicates("name")
+    p_prev = pd.Series(res_bus["p_Pa"].values, index=res_bus["name"].values, dtype=float)
+    m_dot_prev = pd.Series(res_pipe["m_dot_kg/s"].values, index=res_pipe["name"].values, dtype=float)
+
+    p_nodes_init = p_prev.reindex(lev["nodes"]).fillna(p_nom).values
+    m_dot_pipes_init = m_dot_prev.reindex(lev["pipes"]).fillna(0.002).values
+    m_dot_nodes_init = lev["i_mat"] @ m_dot_pipes_init
 
     return np.concatenate((p_nodes_init, m_dot_pipes_init, m_dot_nodes_init))
 
 
 def _eq_model(x, *args):
-    mat, gr, lengths, diameters, roughness, fluid, loads, p_nom = args
-    p_nodes = x[:len(gr.nodes)]
-    m_dot_pipes = x[len(gr.nodes):len(gr.nodes)+len(gr.edges)]
-    m_dot_nodes = x[len(gr.nodes)+len(gr.edges):]
+    mat, mat_t, lengths, diameters, roughness, fluid, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    p_nodes = x[:n_nodes]
+    m_dot_pipes = x[n_nodes:n_nodes+n_pipes]
+    m_dot_nodes = x[n_nodes+n_pipes:]
 
     return np.concatenate((
         _eq_m_dot_sum(m_dot_pipes, m_dot_nodes, mat),
-        _eq_pressure(p_nodes, m_dot_pipes, mat, lengths, diameters, roughness, fluid),
-        _eq_m_dot_node(m_dot_nodes, gr, loads),
-        _eq_p_feed(p_nodes, gr, p_nom)))
+        _eq_pressure(p_nodes, m_dot_pipes, mat_t, lengths, diameters, roughness, fluid),
+        _eq_m_dot_node(m_dot_nodes, idx_load, m_dot_load),
+        _eq_p_feed(p_nodes, idx_feed, p_feed)))
+
+
+def _jac_model(x, *args):
+    """
+    Sparse Jacobian of _eq_model, with the rows in the same order as the residuals
+
+    :param x: the current state (pressures of the nodes, mass flows of the pipes and mass flows of the nodes)
+    :param args: same arguments as _eq_model
+    :return: the Jacobian as a scipy.sparse CSC matrix
+    """
+    mat, mat_t, lengths, diameters, roughness, fluid, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    m_dot_pipes = x[n_nodes:n_nodes+n_pipes]
+
+    eye = sparse.identity(n_nodes, format="csr")
+
+    return sparse.bmat([
+        [None, mat, -eye],
+        [mat_t, sparse.diags(_ddp_dm_dot_vec(m_dot_pipes, lengths, diameters, roughness, fluid)), None],
+        [None, None, eye[idx_load]],
+        [eye[idx_feed], None, None]], format="csc")
+
+
+def _newton(fun, jac, x0, args=(), xtol=1.49012e-08, max_iter=100, linsolve=spsolve):
+    """
+    Solve fun(x, *args) = 0 with a Newton-Raphson method using a sparse Jacobian
+
+    :param fun: the residual function
+    :param jac: the function returning the sparse Jacobian of fun
+    :param x0: the initial guess
+    :param args: extra arguments passed to fun and jac
+    :param xtol: the iterations stop when the relative step is lower than xtol (default: same as fsolve)
+    :param max_iter: maximum number of iterations (default: 100)
+    :param linsolve: the function of the Jacobian and the right-hand side solving each step (default: spsolve)
+    :return: the solution and the number of iterations done
+    """
+    x = np.array(x0, dtype=float)
+    for it in range(1, max_iter + 1):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", sparse.SparseEfficiencyWarning)
+            dx = linsolve(jac(x, *args), -fun(x, *args))
+        x += dx
+        if not np.all(np.isfinite(x)):
+            logging.warning("The Newton-Raphson solver diverged after {} iterations".format(it))
+            break
+        if np.all(np.abs(dx) <= xtol * (np.abs(x) + xtol)):
+            return x, it
+    else:
+        logging.warning("The Newton-Raphson solver did not converge after {} iterations".format(max_iter))
+    return x, it
+
+
+def _loop_basis(mat, idx_feed):
+    """
+    Fundamental cycle basis of a level, for the loop formulation of _eq_model
+
+    A ground node is added, linked to each SRCE node by a virtual pipe, so the paths between two SRCE nodes become
+    loops too. A spanning tree is taken from a breadth first search from the ground node (all the virtual pipes are in
+    it), and each real pipe out of the tree closes one loop.
+
+    :param mat: the incidence matrix of the level (nodes x pipes)
+    :param idx_feed: indexes of the SRCE nodes
+    :return: the loop matrix (loops x pipes then virtual pipes), the positions of the tree pipes (same order) and the
+    incidence matrix of the tree without the ground node (square)
+    """
+    n_nodes, n_pipes = mat.shape
+    n_feed = len(idx_feed)
+
+    virt = sparse.csr_matrix((np.ones(n_feed), (idx_feed, np.arange(n_feed))), shape=(n_nodes, n_feed))
+    a_red = sparse.hstack((mat, virt)).tocsc()
 
+    coo = mat.tocoo()
+    from_nodes = np.empty(n_pipes, dtype=int)
+    to_nodes = np.empty(n_pipes, dtype=int)
+    from_nodes[coo.col[coo.data < 0]] = coo.row[coo.data < 0]
+    to_nodes[coo.col[coo.data > 0]] = coo.row[coo.data > 0]
+    from_nodes = np.concatenate((from_nodes, np.full(n_feed, n_nodes)))
+    to_nodes = np.concatenate((to_nodes, idx_feed))
 
-def _run_sim(net, level="BP", t_grnd=10+273.15):
-    g = top.graphs_by_level_as_dict(net)[level]
+    adj = sparse.csr_matrix((np.ones(len(from_nodes)), (from_nodes, to_nodes)), shape=(n_nodes + 1, n_nodes + 1))
+    _, pred = csgraph.breadth_first_order(adj, n_nodes, directed=False, return_predecessors=True)
+    fwd = pred[to_nodes] == from_nodes
+    cand = np.flatnonzero(fwd | (pred[from_nodes] == to_nodes))
+    _, first = np.unique(np.where(fwd, to_nodes, from_nodes)[cand], return_index=True)
+    tree = cand[first]
+    cotree = np.setdiff1d(np.arange(n_pipes), tree)
 
+    a_tree = a_red[:, tree].tocsc()
+    x = sparse.csc_matrix(spsolve(a_tree, a_red[:, cotree].tocsc())).reshape((len(tree), len(cotree)))
+    loops = sparse.hstack((-x.T, sparse.identity(len(cotree)))).tocsc()
+    loops = loops[:, np.argsort(np.concatenate((tree, cotree)))]
+    return loops.tocsr(), tree, a_tree
+
+
+def _eq_loops(q, loops, m_dot_0, l, d, e, fluid, p_feed):
+    """
+    Sum of the pressure drops around each loop, the pipe mass flows being m_dot_0 + loops.T @ q
+
+    :param q: the mass flows of the loops (in [kg/s])
+    :param loops: the loop matrix given by _loop_basis
+    :param m_dot_0: mass flows of the pipes then virtual pipes meeting the mass balance of the nodes (in [kg/s])
+    :param p_feed: the pressures of the SRCE nodes, the pressure drops of the virtual pipes being -p_feed (in [Pa])
+    :return: the residual of each loop (in [Pa])
+    """
+    m_dot = m_dot_0 + loops.T @ q
+    return loops @ np.concatenate((_dp_from_m_dot_vec(m_dot[:len(l)], l, d, e, fluid), -p_feed))
+
+
+def _jac_loops(q, loops, m_dot_0, l, d, e, fluid, p_feed):
+    """
+    Sparse Jacobian of _eq_loops, the virtual pipes having a constant pressure drop
+    """
+    m_dot = m_dot_0 + loops.T @ q
+    ddp = np.concatenate((_ddp_dm_dot_vec(m_dot[:len(l)], l, d, e, fluid), np.zeros(len(p_feed))))
+    return (loops @ sparse.diags(ddp) @ loops.T).tocsc()
+
+
+def _solve_loops(args, x0, xtol=1.49012e-08, max_iter=100):
+    """
+    Solve the system of _eq_model iterating only on the mass flows of the loops (Newton-Raphson on the loop equations,
+    also known as the loop method or Hardy Cross with a full Jacobian), then recover the pressures of the nodes from the
+    spanning tree
+
+    :param args: the arguments of _eq_model
+    :param x0: the initial guess, only its pipe mass flows are used
+    :param xtol: the tolerance of the Newton-Raphson method on the loop flows, see _newton
+    :param max_iter: maximum number of iterations (default: 100)
+    :return: the solution and the number of iterations done
+    """
+    mat, mat_t, leng, diam, eps, gas, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    loops, tree, a_tree = _loop_basis(mat, idx_feed)
+
+    m_dot_nodes = np.zeros(n_nodes)
+    m_dot_nodes[idx_load] = m_dot_load
+    m_dot_nodes[idx_feed] = 0  # given by the virtual pipes
+
+    m_dot_0 = np.zeros(n_pipes + len(idx_feed))
+    m_dot_0[tree] = spsolve(a_tree, m_dot_nodes)
+
+    is_loop_pipe = np.ones(n_pipes + len(idx_feed), dtype=bool)
+    is_loop_pipe[tree] = False
+    q = x0[n_nodes:n_nodes + n_pipes][is_loop_pipe[:n_pipes]]
+    n_iter = 0
+    if len(q):
+        q, n_iter = _newton(_eq_loops, _jac_loops, q, args=(loops, m_dot_0, leng, diam, eps, gas, p_feed),
+                            xtol=xtol, max_iter=max_iter)
+        logging.debug("LOOP {} loops, {} iterations".format(len(q), n_iter))
+
+    m_dot = m_dot_0 + loops.T @ q
+    m_dot_pipes = m_dot[:n_pipes]
+    dp = np.concatenate((_dp_from_m_dot_vec(m_dot_pipes, leng, diam, eps, gas), -p_feed))
+    p_nodes = np.atleast_1d(spsolve(a_tree.T.tocsc(), -dp[tree]))
+
+    return np.concatenate((p_nodes, m_dot_pipes, mat @ m_dot_pipes)), n_iter
+
+
+def _dense_jac_model(x, *args):
+    return _jac_model(x, *args).toarray()
+
+
+def _ilu_precond(jac):
+    """
+    Default preconditioner of the krylov solver: incomplete LU factorization of the Jacobian, its rows scaled to a max
+    of 1 first (the mass balance and pressure rows differ by orders of magnitude), with a minimum degree ordering of
+    J^T + J (the default one gives zero pivots on meshed levels)
+
+    :param jac: the sparse Jacobian
+    :return: an approximate inverse of the Jacobian, as a scipy LinearOperator
+    """
+    row_max = abs(jac).max(axis=1).toarray().ravel()
+    scale = 1 / np.where(row_max > 0, row_max, 1)
+    ilu = spilu((sparse.diags(scale) @ jac).tocsc(), permc_spec="MMD_AT_PLUS_A")
+    return LinearOperator(ilu.shape, lambda b: ilu.solve(scale * np.ravel(b)))
+
+
+def _krylov_linsolve(precond=_ilu_precond, rtol=1E-10):
+    """
+    Linear solver for _newton solving each step with preconditioned GMRES instead of a sparse LU factorization
+
+    :param precond: a function of the sparse Jacobian returning an approximate inverse of it, as a matrix or a scipy
+    LinearOperator, or None (default: _ilu_precond)
+    :param rtol: the relative tolerance of GMRES (default: 1E-10)
+    :return: a function of the sparse Jacobian and the right-hand side returning the step
+    """
+    def _linsolve(jac, b):
+        m = precond(jac) if precond is not None else None
+        dx, info = gmres(jac, b, M=m, atol=0.0, **{_GMRES_RTOL: rtol})
+        if info != 0:
+            logging.warning("GMRES did not converge ({})".format(info))
+        return dx
+    return _linsolve
+
+
+SOLVERS = ("fsolve", "hybr", "lm", "krylov", "newton", "loop")
+SOLVER_OPTIONS = ("tol", "max_iter", "precond", "reduce")
+
+
+def _roughness(materials):
+    """
+    Absolute roughness of pipes, computed once per material
+
+    :param materials: the materials of the pipes
+    :return: an array of roughness (in [m])
+    """
+    if len(materials) == 0:
+        return np.zeros(0)
+    names, inverse = np.unique(np.asarray(materials, dtype=str), return_inverse=True)
+    return np.array([fr.material_roughness(m) for m in names], dtype=float)[inverse]
+
+
+def _compile_level(net, level, t_grnd=10+273.15, topo=None, stats=None):
+    """
+    Gather everything needed to solve a pressure level that does not depend on the load and pressure values, so it can
+    be reused by several solves
+
+    With the m_dot_load and p_feed vectors expected by _eq_m_dot_node and _eq_p_feed:
+        m_dot_load = load_mat @ (load p_kW * scaling / LHV) + stat_load_mat @ (station mass flows)
+        p_feed = feeder_mat @ (feeder p_Pa) + stat_feed_mat @ (station p_Pa)
+    where the columns of the matrices follow the row order of the load, feeder and station tables.
+
+    :param net: the given network
+    :param level: the pressure level
+    :param t_grnd: temperature of the ground (in [K])
+    :param topo: the arrays of the network given by topology.create_topology, built if None (default: None)
+    :param stats: a dict where the time spent building the topology, the gas properties and the whole level are
+    stored, as "topology_s", "gas_s" and "compile_s" (default: None)
+    :return: a dict with the names and types of the nodes, the names of the pipes, the gas, the incidence matrix and
+    its transpose, the pipe arrays, the node index arrays, the matrices above, the positions of the nodes, pipes,
+    feeders and stations in the level, and the node of each load (-1 if not in the level)
+    """
+    try:
+        assert net.FRICTION in fr.CORRELATIONS
+    except AssertionError:
+        msg = "The friction factor correlation {} is not in {}".format(net.FRICTION, fr.CORRELATIONS)
+        logging.error(msg)
+        raise ValueError(msg)
+
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    if topo is None:
+        topo = top.create_topology(net)
+        stats["topology_s"] = time.perf_counter() - start
+
+    node_ids = np.flatnonzero(topo["bus_mask"][level])
+    pipe_ids = np.flatnonzero(topo["pipe_mask"][level])
+
+    local = np.full(len(topo["bus_name"]), -1)
+    local[node_ids] = np.arange(len(node_ids))
+
+    types = topo["bus_type"][node_ids]
+    idx_load = np.concatenate((np.flatnonzero(types == "SINK"), np.flatnonzero(types == "NODE")))
+    idx_feed = np.flatnonzero(types == "SRCE")
+
+    def _rows(rows_of_node, buses):
+        ids = top._positions(topo["bus_name"], np.asarray(buses))
+        nodes = np.where(ids >= 0, local[ids], -1)
+        return np.where(nodes >= 0, rows_of_node[nodes], -1)
+
+    def _mat(idx, buses):
+        rows_of_node = np.full(len(node_ids), -1)
+        rows_of_node[idx] = np.arange(len(idx))
+        rows = _rows(rows_of_node, buses)
+        cols = np.flatnonzero(rows >= 0)
+        return sparse.csr_matrix((np.ones(len(cols)), (rows[cols], cols)), shape=(len(idx), len(rows)))
+
+    pipe_from = local[topo["pipe_from"][pipe_ids]]
+    pipe_to = local[topo["pipe_to"][pipe_ids]]
+    try:
+        assert (pipe_to >= 0).all()
+    except AssertionError:
+        msg = "The pipes {} link the level {} to buses of another level !".format(
+            topo["pipe_name"][pipe_ids[pipe_to < 0]].tolist(), level)
+        logging.error(msg)
+        raise ValueError(msg)
+    i_mat = top.incidence_matrix(len(node_ids), pipe_from, pipe_to)
+    _, components = csgraph.connected_components(abs(i_mat) @ abs(i_mat).T, directed=False)
+
+    start_gas = time.perf_counter()
     gas = Chemical('natural gas', T=t_grnd, P=net.LEVELS[level])
+    fluid = fr.Fluid(gas.rho, gas.mu, net.FRICTION, net.RE_BLEND)
+    stats["gas_s"] = time.perf_counter() - start_gas
+
+    lev = {
+        "level": level,
+        "nodes": topo["bus_name"][node_ids].tolist(),
+        "types": types,
+        "pipes": topo["pipe_name"][pipe_ids].tolist(),
+        "gas": gas,
+        "fluid": fluid,
+        "i_mat": i_mat,
+        "i_mat_t": i_mat.T.tocsr(),
+        "pipe_from": pipe_from,
+        "pipe_to": pipe_to,
+        "components": components,
+        "leng": topo["pipe_length"][pipe_ids],
+        "diam": topo["pipe_diameter"][pipe_ids],
+        "eps": _roughness(topo["pipe_material"][pipe_ids]),
+        "idx_load": idx_load,
+        "idx_feed": idx_feed,
+        "load_mat": _mat(idx_load, net.load["bus"]),
+        "stat_load_mat": _mat(idx_load, net.station["bus_high"]),
+        "feeder_mat": _mat(idx_feed, net.feeder["bus"]),
+        "stat_feed_mat": _mat(idx_feed, net.station["bus_low"]),
+        "bus_pos": node_ids,
+        "pipe_pos": topo["pipe_pos"][pipe_ids],
+        "feeder_nodes": _rows(np.arange(len(node_ids)), net.feeder["bus"]),
+        "stat_nodes": _rows(np.arange(len(node_ids)), net.station["bus_low"]),
+        "load_nodes": _rows(np.arange(len(node_ids)), net.load["bus"]),
+    }
+    stats["compile_s"] = time.perf_counter() - start
+    return lev
 
-    x0 = _init_variables(g, net.LEVELS[level])
-    i_mat = _i_mat(g)
 
-    leng = np.array([data["L_m"] for _, _, data in g.edges(data=True)])
-    diam = np.array([data["D_m"] for _, _, data in g.edges(data=True)])
+def _compile_levels(net, t_grnd=10+273.15):
+    """
+    Compile all the pressure levels of a given network with _compile_level, building the network arrays only once
 
-    materials = np.array([data["mat"] for _, _, data in g.edges(data=True)])
-    eps = np.array([fluids.material_roughness(m) for m in materials])
+    :param net: the given network
+    :param t_grnd: temperature of the ground (in [K])
+    :return: a dict of compiled levels, sorted by increasing nominal pressure
+    """
+    topo = top.create_topology(net)
+    return {level: _compile_level(net, level, t_grnd, topo)
+            for level, _ in sorted(net.LEVELS.items(), key=lambda item: item[1]) if level in topo["bus_mask"]}
+
+
+def _level_args(lev):
+    return lev["i_mat"], lev["i_mat_t"], lev["leng"], lev["diam"], lev["eps"], lev["fluid"]
+
+
+def _is_radial(args):
+    """
+    Check if the system of _eq_model is a radial (tree) network fed by a single node
+
+    :param args: the arguments of _eq_model
+    :return: True if the network is a tree with one SRCE node
+    """
+    mat, idx_feed = args[0], args[8]
+    n_nodes, n_pipes = mat.shape
+    if len(idx_feed) != 1 or n_pipes != n_nodes - 1:
+        return False
+    n_comp, _ = csgraph.connected_components(abs(mat) @ abs(mat).T, directed=False)
+    return n_comp == 1
+
+
+def _solve_radial(args):
+    """
+    Solve the system of _eq_model for a radial network without iterating: the mass flows of the pipes follow from the
+    mass balance of the nodes, and the pressures from the pressure drops of the pipes, down from the SRCE node
+
+    Both are linear systems on the incidence matrix without the row of the SRCE node, which is square and triangular
+    up to a permutation for a tree.
+
+    :param args: the arguments of _eq_model, see _is_radial
+    :return: the solution
+    """
+    mat, mat_t, leng, diam, eps, gas, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    root = idx_feed[0]
+    keep = np.arange(n_nodes) != root
+
+    m_dot_nodes = np.zeros(n_nodes)
+    m_dot_nodes[idx_load] = m_dot_load
+    m_dot_nodes[root] = -m_dot_nodes.sum()
+
+    p_nodes = np.full(n_nodes, p_feed[0], dtype=float)
+    m_dot_pipes = np.zeros(n_pipes)
+    if n_pipes:
+        red = mat[keep].tocsc()
+        m_dot_pipes = np.atleast_1d(spsolve(red, m_dot_nodes[keep]))
+        dp = _dp_from_m_dot_vec(m_dot_pipes, leng, diam, eps, gas)
+        p_nodes[keep] = spsolve(red.T.tocsc(), -dp - mat_t[:, [root]].toarray().ravel() * p_feed[0])
+
+    return np.concatenate((p_nodes, m_dot_pipes, m_dot_nodes))
+
+
+def _solve(args, x0, solver="fsolve", options=None):
+    """
+    Solve the system of _eq_model for a level, directly with _solve_radial if it is radial
+
+    The solvers are:
+        - "fsolve": scipy's hybrid method with a finite-difference Jacobian
+        - "hybr" and "lm": scipy.optimize.root's hybrid and Levenberg-Marquardt methods with the analytic Jacobian, as
+          a dense matrix
+        - "newton": Newton-Raphson method with the sparse analytic Jacobian, see _newton
+        - "krylov": the same Newton-Raphson method solving each step with preconditioned GMRES, without the fill-in
+          of a sparse LU factorization on the largest levels, see _krylov_linsolve
+        - "loop": Newton-Raphson method on the loop flows only, see _solve_loops
+
+    :param args: the arguments of _eq_model
+    :param x0: the initial guess
+    :param solver: one of SOLVERS (default: "fsolve")
+    :param options: a dict of options of the solver (default: None):
+        - "tol": the tolerance on the relative step (default: 1.49012e-08)
+        - "max_iter": the maximum number of iterations, or of residual evaluations for "fsolve" and "hybr" (default:
+          the solver's own, 100 for "newton", "krylov" and "loop")
+        - "precond": for "krylov", a function of the sparse Jacobian returning an approximate inverse of it (a matrix
+          or a scipy LinearOperator), or None (default: _ilu_precond)
+        - "reduce": used by _solve_level, ignored here
+    :return: the solution, and a dict with the numbers of residual ("n_fev") and Jacobian ("n_jev") evaluations, the
+    number of iterations ("n_iter", None if the solver does not report it) and the max norm of the final residual
+    ("residual")
+    """
+    options = {} if options is None else options
+    try:
+        assert set(options) <= set(SOLVER_OPTIONS)
+    except AssertionError:
+        msg = "The solver options {} are not in {}".format(sorted(set(options) - set(SOLVER_OPTIONS)), SOLVER_OPTIONS)
+        logging.error(msg)
+        raise ValueError(msg)
+    tol = options.get("tol")
+    max_iter = options.get("max_iter")
+
+    if solver in SOLVERS and _is_radial(args):
+        res = _solve_radial(args)
+        info = {"n_fev": 0, "n_jev": 0, "n_iter": 0}
+    elif solver == "fsolve":
+        res, infodict, ier, mesg = fsolve(_eq_model, x0, args=args, full_output=True,
+                                          xtol=1.49012e-08 if tol is None else tol, maxfev=max_iter or 0)
+        if ier != 1:
+            warnings.warn(mesg, RuntimeWarning)
+        info = {"n_fev": infodict["nfev"], "n_jev": infodict.get("njev", 0), "n_iter": None}
+    elif solver in ("hybr", "lm"):
+        opts = {"maxfev" if solver == "hybr" else "maxiter": max_iter or 0}
+        sol = root(_eq_model, x0, args=args, method=solver, jac=_dense_jac_model, tol=tol, options=opts)
+        if not sol.success:
+            warnings.warn(sol.message, RuntimeWarning)
+        res = sol.x
+        info = {"n_fev": sol.get("nfev", 0), "n_jev": sol.get("njev", 0), "n_iter": None}
+    elif solver in ("newton", "krylov"):
+        linsolve = _krylov_linsolve(options.get("precond", _ilu_precond)) if solver == "krylov" else spsolve
+        res, n_iter = _newton(_eq_model, _jac_model, x0, args=args, xtol=1.49012e-08 if tol is None else tol,
+                              max_iter=max_iter or 100, linsolve=linsolve)
+        logging.debug("NEWTON {} iterations".format(n_iter))
+        info = {"n_fev": n_iter, "n_jev": n_iter, "n_iter": n_iter}
+    elif solver == "loop":
+        res, n_iter = _solve_loops(args, x0, xtol=1.49012e-08 if tol is None else tol, max_iter=max_iter or 100)
+        info = {"n_fev": n_iter, "n_jev": n_iter, "n_iter": n_iter}
+    else:
+        msg = "The solver {} is not in {}".format(solver, SOLVERS)
+        logging.error(msg)
+        raise ValueError(msg)
+    info["residual"] = float(np.abs(_eq_model(res, *args)).max()) if len(res) else 0.0
+    return res, info
+
+
+def _merge_info(infos):
+    """
+    Merge the statistics of several solves given by _solve: the evaluations are summed, the iterations and residuals
+    are the largest ones
+    """
+    iters = [info["n_iter"] for info in infos if info["n_iter"] is not None]
+    return {
+        "n_fev": sum(info["n_fev"] for info in infos),
+        "n_jev": sum(info["n_jev"] for info in infos),
+        "n_iter": max(iters) if iters else None,
+        "residual": max((info["residual"] for info in infos), default=0.0),
+    }
+
+
+def _solve_task(task):
+    return _solve(*task)
+
+
+def _groups(labels, n_groups):
+    """
+    Split the positions of an array of labels 0..n_groups-1 into one array of positions per label
+
+    :param labels: the array of labels
+    :param n_groups: the number of labels
+    :return: a list of arrays of positions
+    """
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(n_groups + 1))
+    return [order[bounds[i]:bounds[i+1]] for i in range(n_groups)]
+
+
+def _reduce_topology(n_nodes, pipe_from, pipe_to, removable, diam, eps):
+    """
+    Reduce the topology of a level without changing its solution:
+        - the dead ends made of removable nodes are folded, one node after the other: their pipes have no flow
+        - the removable nodes joining exactly two pipes (or merged pipes) with the same diameter and roughness are
+          removed, the pipes being merged into one equivalent pipe, the sum of their lengths
+
+    :param n_nodes: the number of nodes
+    :param pipe_from: the from node of each pipe
+    :param pipe_to: the to node of each pipe
+    :param removable: a mask of the nodes that can be removed (NODE nodes, without load nor feed)
+    :param diam: the diameters of the pipes
+    :param eps: the roughness of the pipes
+    :return: the mask of the removed nodes, the pipe linking each removed node to a node closer to the kept ones (-1
+    for the kept nodes), the pipes that are still there (each one standing for the merged pipes), the ends of the
+    merged pipes, and the merged pipes as lists of (pipe, sign) from one end to the other
+    """
+    n_pipes = len(pipe_from)
+    ends = [[f, t] for f, t in zip(pipe_from.tolist(), pipe_to.tolist())]
+    segments = [[(j, 1)] for j in range(n_pipes)]
+    adj = [set() for _ in range(n_nodes)]
+    for j, (f, t) in enumerate(ends):
+        adj[f].add(j)
+        adj[t].add(j)
+
+    alive = np.ones(n_pipes, dtype=bool)
+    removed = np.zeros(n_nodes, dtype=bool)
+    parent = np.full(n_nodes, -1)
+
+    def _other(g, n):
+        return ends[g][1] if ends[g][0] == n else ends[g][0]
+
+    # dead ends
+    stack = [n for n in range(n_nodes) if removable[n] and len(adj[n]) == 1]
+    while stack:
+        n = stack.pop()
+        g = next(iter(adj[n]))
+        q = _other(g, n)
+        if q == n:
+            continue
+        adj[n].clear()
+        adj[q].discard(g)
+        alive[g] = False
+        removed[n] = True
+        parent[n] = g
+        if removable[q] and not removed[q] and len(adj[q]) == 1:
+            stack.append(q)
+
+    # series pipes
+    for n in range(n_nodes):
+        if not removable[n] or removed[n] or len(adj[n]) != 2:
+            continue
+        g1, g2 = adj[n]
+        x, y = _other(g1, n), _other(g2, n)
+        if n in (x, y) or x == y or diam[g1] != diam[g2] or eps[g1] != eps[g2]:
+            continue
+        seg1 = segments[g1] if ends[g1][1] == n else [(j, -sign) for j, sign in reversed(segments[g1])]
+        seg2 = segments[g2] if ends[g2][0] == n else [(j, -sign) for j, sign in reversed(segments[g2])]
+        segments[g1], ends[g1] = seg1 + seg2, [x, y]
+        adj[y].discard(g2)
+        adj[y].add(g1)
+        adj[n].clear()
+        alive[g2] = False
+        removed[n] = True
+
+    # the removed nodes inside a merged pipe hang on the pipe before them
+    for g in np.flatnonzero(alive):
+        node = ends[g][0]
+        for j, sign in segments[g][:-1]:
+            node = pipe_to[j] if sign == 1 else pipe_from[j]
+            parent[node] = j
+
+    return removed, parent, alive, ends, segments
+
+
+def _reduce_level(lev):
+    """
+    Reduced system of a compiled level, see _reduce_topology, with the arrays needed by _solve_level and _expand
+
+    :param lev: the compiled level
+    :return: a dict like a compiled level, or None if no node can be removed
+    """
+    n_nodes, n_pipes = lev["i_mat"].shape
+    removed, parent, alive, ends, segments = _reduce_topology(
+        n_nodes, lev["pipe_from"], lev["pipe_to"], lev["types"] == "NODE", lev["diam"], lev["eps"])
+    if not removed.any():
+        return None
+
+    kept = np.flatnonzero(~removed)
+    local = np.full(n_nodes, -1)
+    local[kept] = np.arange(len(kept))
+
+    pipes = np.flatnonzero(alive)
+    seg_pipe = np.array([j for g in pipes for j, _ in segments[g]], dtype=int)
+    seg_sign = np.array([sign for g in pipes for _, sign in segments[g]], dtype=float)
+    seg_group = np.repeat(np.arange(len(pipes)), [len(segments[g]) for g in pipes])
+    red_from = local[[ends[g][0] for g in pipes]].astype(int)
+    red_to = local[[ends[g][1] for g in pipes]].astype(int)
+    i_mat = top.incidence_matrix(len(kept), red_from, red_to)
+
+    logging.debug("REDUCE {} nodes and {} pipes to {} nodes and {} pipes".format(
+        n_nodes, n_pipes, len(kept), len(pipes)))
+    return {
+        "removed": removed,
+        "kept": kept,
+        "local": local,
+        "pipes": pipes,
+        "seg_pipe": seg_pipe,
+        "seg_sign": seg_sign,
+        "seg_group": seg_group,
+        "first_seg": np.searchsorted(seg_group, np.arange(len(pipes))),
+        "parent": parent[parent >= 0],
+        "parent_nodes": np.flatnonzero(parent >= 0),
+        "i_mat": i_mat,
+        "i_mat_t": i_mat.T.tocsr(),
+        "leng": np.bincount(seg_group, weights=lev["leng"][seg_pipe], minlength=len(pipes)),
+        "diam": lev["diam"][pipes],
+        "eps": lev["eps"][pipes],
+        "pipe_from": red_from,
+        "pipe_to": red_to,
+        "components": lev["components"][kept],
+    }
+
+
+def _reduced_problem(red, args, x0):
+    """
+    Arguments of _eq_model and initial guess of a reduced level, see _reduce_level
+
+    :param red: the reduced level, see _reduce_level
+    :param args: the arguments of _eq_model for the whole level
+    :param x0: the initial guess for the whole level
+    :return: the arguments and the initial guess of the reduced system
+    """
+    mat, mat_t, leng, diam, eps, fluid, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    kept, first = red["kept"], red["first_seg"]
+
+    load_rows = ~red["removed"][idx_load]
+    red_args = (red["i_mat"], red["i_mat_t"], red["leng"], red["diam"], red["eps"], fluid,
+                red["local"][idx_load[load_rows]], m_dot_load[load_rows], red["local"][idx_feed], p_feed)
+    red_x0 = np.concatenate((x0[kept], x0[n_nodes + red["seg_pipe"][first]] * red["seg_sign"][first],
+                             x0[n_nodes + n_pipes + kept]))
+    return red_args, red_x0
+
+
+def _expand(red, args, red_res):
+    """
+    Solution of a level from the solution of its reduced system: the merged pipes give the flow of their pipes, the
+    folded pipes have no flow, and the pressures of the removed nodes follow from the pressure drops of the pipes
+    linking them to the kept nodes (a triangular system up to a permutation, as in _solve_radial)
+
+    :param red: the reduced level, see _reduce_level
+    :param args: the arguments of _eq_model for the whole level
+    :param red_res: the solution of the reduced system
+    :return: the solution for the whole level
+    """
+    mat, mat_t, leng, diam, eps, fluid, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    kept, n_kept, n_red_pipes = red["kept"], len(red["kept"]), len(red["pipes"])
+
+    p_nodes = np.zeros(n_nodes)
+    p_nodes[kept] = red_res[:n_kept]
+    m_dot_pipes = np.zeros(n_pipes)
+    m_dot_pipes[red["seg_pipe"]] = red["seg_sign"] * red_res[n_kept:n_kept + n_red_pipes][red["seg_group"]]
+    m_dot_nodes = np.zeros(n_nodes)
+    m_dot_nodes[kept] = red_res[n_kept + n_red_pipes:]
+
+    nodes, pipes = red["parent_nodes"], red["parent"]
+    dp = _dp_from_m_dot_vec(m_dot_pipes[pipes], leng[pipes], diam[pipes], eps[pipes], fluid)
+    rhs = -dp - mat_t[pipes][:, kept] @ p_nodes[kept]
+    p_nodes[nodes] = np.atleast_1d(spsolve(mat_t[pipes][:, nodes].tocsc(), rhs))
+
+    return np.concatenate((p_nodes, m_dot_pipes, m_dot_nodes))
+
+
+def _solve_level(lev, args, x0, solver="fsolve", executor=None, options=None):
+    """
+    Solve the system of _eq_model for a compiled level, as one independent system per connected component of the
+    level
+
+    :param lev: the compiled level
+    :param args: the arguments of _eq_model for the whole level
+    :param x0: the initial guess for the whole level
+    :param solver: one of SOLVERS, see _solve (default: "fsolve")
+    :param executor: a concurrent.futures executor (thread or process pool) to solve the components in parallel, or
+    None to solve them one after the other (default: None)
+    :param options: the options of the solver, see _solve, and "reduce": if True, the reduced system of the level is
+    solved, see _reduce_topology (default: None)
+    :return: the solution for the whole level, and the statistics of the solves merged by _merge_info, with the
+    numbers of nodes and pipes of the reduced system ("n_nodes_reduced", "n_pipes_reduced") if it was solved
+    """
+    options = {} if options is None else options
+    if options.get("reduce"):
+        options = {key: value for key, value in options.items() if key != "reduce"}
+        if "reduced" not in lev:
+            lev["reduced"] = _reduce_level(lev)
+        red = lev["reduced"]
+        if red is not None:
+            red_args, red_x0 = _reduced_problem(red, args, x0)
+            red_res, info = _solve_level(red, red_args, red_x0, solver, executor, options)
+            res = _expand(red, args, red_res)
+            info["residual"] = float(np.abs(_eq_model(res, *args)).max())
+            info["n_nodes_reduced"], info["n_pipes_reduced"] = red["i_mat"].shape
+            return res, info
+
+    labels = lev["components"]
+    n_comp = labels.max() + 1 if len(labels) else 0
+    if n_comp <= 1:
+        return _solve(args, x0, solver, options)
+
+    mat, mat_t, leng, diam, eps, gas, idx_load, m_dot_load, idx_feed, p_feed = args
+    n_nodes, n_pipes = mat.shape
+    pipe_labels = labels[lev["pipe_from"]]
+
+    nodes = _groups(labels, n_comp)
+    pipes = _groups(pipe_labels, n_comp)
+    loads = _groups(labels[idx_load], n_comp)
+    feeds = _groups(labels[idx_feed], n_comp)
+
+    local = np.empty(n_nodes, dtype=int)
+    for n in nodes:
+        local[n] = np.arange(len(n))
+
+    tasks = []
+    for n, p, ld, fd in zip(nodes, pipes, loads, feeds):
+        sub = top.incidence_matrix(len(n), local[lev["pipe_from"][p]], local[lev["pipe_to"][p]])
+        sub_args = (sub, sub.T.tocsr(), leng[p], diam[p], eps[p], gas,
+                    local[idx_load[ld]], m_dot_load[ld], local[idx_feed[fd]], p_feed[fd])
+        sub_x0 = np.concatenate((x0[n], x0[n_nodes + p], x0[n_nodes + n_pipes + n]))
+        tasks.append((sub_args, sub_x0, solver, options))
+
+    logging.debug("SOLVE {} independent components".format(n_comp))
+    sub_res = executor.map(_solve_task, tasks) if executor is not None else map(_solve_task, tasks)
+
+    res = np.empty(len(x0))
+    infos = []
+    for n, p, (r, info) in zip(nodes, pipes, sub_res):
+        res[n] = r[:len(n)]
+        res[n_nodes + p] = r[len(n):len(n) + len(p)]
+        res[n_nodes + n_pipes + n] = r[len(n) + len(p):]
+        infos.append(info)
+    return res, _merge_info(infos)
+
+
+def _hash_tables(*dfs):
+    h = hashlib.sha1()
+    for df in dfs:
+        h.update(str(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def _level_fingerprints(net, level, t_grnd):
+    """
+    Fingerprints of the parts of a given network that a pressure level depends on
+
+    :param net: the given network
+    :param level: the pressure level
+    :param t_grnd: temperature of the ground (in [K])
+    :return: the fingerprint of the topology of the level (buses, pipes, stations, gas and friction settings of the
+    network) and the fingerprint of its loads, feeders and incoming station flows (as currently written in
+    res_station)
+    """
+    buses = net.bus.loc[net.bus["level"] == level]
+    pipes = net.pipe.loc[net.pipe["from_bus"].isin(buses["name"])]
+    stations = net.station.loc[net.station["bus_high"].isin(buses["name"]) | net.station["bus_low"].isin(buses["name"])]
+    loads = net.load.loc[net.load["bus"].isin(buses["name"])]
+    feeders = net.feeder.loc[net.feeder["bus"].isin(buses["name"])]
+    flows = net.res_station.loc[net.res_station["name"].isin(stations["name"])]
+
+    topo = _hash_tables(buses, pipes, stations, loads[["name", "bus"]], feeders[["name", "bus"]])
+    topo += repr((t_grnd, net.LEVELS[level], net.FRICTION, net.RE_BLEND, net.LHV))
+    return topo, _hash_tables(loads, feeders, flows)
+
+
+def _level_sizes(lev, info=None):
+    """
+    Sizes of a compiled level for its statistics, see net.res_stats
+
+    :param lev: the compiled level
+    :param info: the statistics of its solve, giving the sizes of the reduced system if it was solved, see
+    _solve_level (default: None)
+    :return: a dict of sizes, the reduced ones being the full ones if the level was not reduced
+    """
+    info = {} if info is None else info
+    n_nodes, n_pipes = lev["i_mat"].shape
+    n_comp = int(lev["components"].max()) + 1 if len(lev["components"]) else 0
+    return {"n_nodes": n_nodes, "n_pipes": n_pipes, "n_components": n_comp,
+            "n_nodes_reduced": info.get("n_nodes_reduced", n_nodes),
+            "n_pipes_reduced": info.get("n_pipes_reduced", n_pipes)}
+
+
+def _run_level(net, level="BP", t_grnd=10+273.15, solver="fsolve", init=None, use_cache=False, executor=None,
+               stats=None, options=None):
+    """
+    Compute the pressures and mass flows of a pressure level of a given network
+
+    :param net: the given network
+    :param level: the pressure level (default: "BP")
+    :param t_grnd: temperature of the ground (in [K], default: 10°C)
+    :param solver: one of SOLVERS, see _solve (default: "fsolve")
+    :param init: the res_bus and res_pipe tables of a previous simulation used as initial guess, or None for a flat
+    initial guess (default: None)
+    :param use_cache: if True, the compiled level and the results are kept in net.cache, and reused as long as the
+    buses, pipes, stations, loads, feeders and incoming station flows of the level do not change (default: False)
+    :param executor: a concurrent.futures executor to solve the independent parts of the level in parallel, see
+    _solve_level (default: None)
+    :param stats: a dict filled with the statistics of the level, see net.res_stats: sizes, time spent in each phase,
+    numbers of evaluations and iterations, final residual, and whether the cached results were reused (default: None)
+    :param options: the options of the solver, see _solve (default: None)
+    :return: the compiled level, and the rounded arrays of the pressures of the nodes, the mass flows of the pipes and
+    the mass flows of the nodes
+    """
+    stats = {} if stats is None else stats
+    stats.update({"level": level, "solver": solver, "cached": False, "fingerprint_s": 0.0, "topology_s": 0.0,
+                  "gas_s": 0.0, "compile_s": 0.0, "solve_s": 0.0, "n_fev": 0, "n_jev": 0, "n_iter": 0})
+
+    if use_cache:
+        start = time.perf_counter()
+        topo, values = _level_fingerprints(net, level, t_grnd)
+        stats["fingerprint_s"] = time.perf_counter() - start
+        cached = net.cache.get(level, {})
+        if cached.get("topo") == topo and cached.get("values") == (values, solver, options):
+            logging.debug("SIM {} unchanged, results reused".format(level))
+            stats.update(cached=True, residual=cached["info"]["residual"],
+                         **_level_sizes(cached["lev"], cached["info"]))
+            return cached["res"]
+        lev = cached["lev"] if cached.get("topo") == topo else _compile_level(net, level, t_grnd, stats=stats)
+    else:
+        lev = _compile_level(net, level, t_grnd, stats=stats)
+    n_nodes, n_pipes = lev["i_mat"].shape
+    stats.update(_level_sizes(lev))
+
+    if init is None:
+        x0 = _init_variables(lev, net.LEVELS[level])
+    else:
+        x0 = _init_variables_from_results(lev, net.LEVELS[level], *init)
 
     load = _scaled_loads_as_dict(net)
     p_nom = _p_nom_feed_as_dict(net)
@@ -123,14 +1019,33 @@ def _run_sim(net, level="BP", t_grnd=10+273.15):
     logging.debug("LOADS {}".format(load))
     logging.debug("P_NOM {}".format(p_nom))
 
-    res = fsolve(_eq_model, x0, args=(i_mat, g, leng, diam, eps, gas, load, p_nom))
+    start = time.perf_counter()
+    res, info = _solve_level(lev, _level_args(lev) + _node_vectors(lev, load, p_nom), x0, solver, executor, options)
+    stats["solve_s"] = time.perf_counter() - start
+    stats.update(info)
+
+    p_nodes = np.round(res[:n_nodes], 1)
+    m_dot_pipes = np.round(res[n_nodes:n_nodes + n_pipes], 6)
+    m_dot_nodes = np.round(res[n_nodes + n_pipes:], 6)
+
+    if use_cache:
+        net.cache[level] = {"topo": topo, "values": (values, solver, options), "lev": lev, "info": info,
+                            "res": (lev, p_nodes, m_dot_pipes, m_dot_nodes)}
+    return lev, p_nodes, m_dot_pipes, m_dot_nodes
+
+
+def _run_sim(net, level="BP", t_grnd=10+273.15, solver="fsolve", init=None, use_cache=False, stats=None,
+             options=None):
+    """
+    Compute the pressures and mass flows of a pressure level of a given network, see _run_level
 
-    p_nodes = np.round(res[:len(g.nodes)], 1)
-    m_dot_pipes = np.round(res[len(g.nodes):len(g.nodes) + len(g.edges)], 6)
-    m_dot_nodes = np.round(res[len(g.nodes) + len(g.edges):], 6)
+    :return: the pressures of the nodes, the mass flows of the pipes and of the nodes (as dicts) and the gas
+    """
+    lev, p_nodes, m_dot_pipes, m_dot_nodes = _run_level(net, level, t_grnd, solver, init, use_cache, stats=stats,
+                                                        options=options)
 
-    p_nodes = {n: p_nodes[i] for i, n in enumerate(g.nodes)}
-    m_dot_pipes = {data["name"]: m_dot_pipes[i] for i, (_, _, data) in enumerate(g.edges(data=True))}
-    m_dot_nodes = {n: m_dot_nodes[i] for i, n in enumerate(g.nodes)}
+    p_nodes = dict(zip(lev["nodes"], p_nodes))
+    m_dot_pipes = dict(zip(lev["pipes"], m_dot_pipes))
+    m_dot_nodes = dict(zip(lev["nodes"], m_dot_nodes))
 
-    return p_nodes, m_dot_pipes, m_dot_nodes, gas
+    return p_nodes, m_dot_pipes, m_dot_nodes, lev["gas"]
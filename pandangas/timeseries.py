@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+    Implementation of the time series simulation methods.
+
+    Usage:
+
+    >>> import pandas as pd
+    >>> import pandangas as pg
+
+    >>> profiles = pd.DataFrame({"LOAD2": [1.0, 0.5, 0.8], "LOAD3": [1.0, 1.2, 0.3]})
+    >>> ts = pg.runpp_timeseries(net, profiles)
+    >>> ts["p_Pa"]  # one row per time step, one column per bus
+
+"""
+
+import logging
+
+import numpy as np
+
+import pandangas.model as md
+
+
+PROFILES = ("scaling", "p_kW")
+
+
+def _load_m_dot(net, load_profiles, profile):
+    """
+    Mass flows consumed by the loads of a given network at each time step of the load profiles
+
+    :param net: the given network
+    :param load_profiles: a DataFrame with one row per time step and one column per load
+    :param profile: "scaling" or "p_kW", the load column replaced by the profiles
+    :return: an array with one row per time step and one column per load (in [kg/s])
+    """
+    try:
+        assert profile in PROFILES
+    except AssertionError:
+        msg = "The profile type {} is not in {}".format(profile, PROFILES)
+        logging.error(msg)
+        raise ValueError(msg)
+
+    unknown = [load for load in load_profiles.columns if load not in net.name_index["load"]]
+    try:
+        assert not unknown
+    except AssertionError:
+        msg = "The loads {} do not exist !".format(unknown)
+        logging.error(msg)
+        raise ValueError(msg)
+
+    n_steps = len(load_profiles.index)
+    p_kw = np.tile(net.load["p_kW"].values.astype(float), (n_steps, 1))
+    scaling = np.tile(net.load["scaling"].values.astype(float), (n_steps, 1))
+
+    cols = net.load.index.get_indexer([net.name_index["load"][load] for load in load_profiles.columns])
+    (scaling if profile == "scaling" else p_kw)[:, cols] = load_profiles.values.astype(float)
+
+    return p_kw * scaling / net.LHV  # kW to kg/s
+
+
+def iter_timeseries(net, load_profiles, profile="scaling", t_grnd=10+273.15, solver="fsolve", solver_options=None):
+    """
+    Compute the pressures and mass flows of a given network for each time step of some load profiles, as
+    runpp_timeseries, yielding the results of each time step as soon as it is solved
+
+    :param net: the given network
+    :param load_profiles: a DataFrame with one row per time step and one column per load name, see runpp_timeseries
+    :param profile: "scaling" or "p_kW", see runpp_timeseries (default: "scaling")
+    :param t_grnd: temperature of the ground, used for the gas properties (in [K], default: 10°C)
+    :param solver: the solver, see runpp (default: "fsolve")
+    :param solver_options: the options of the solver, see runpp (default: None)
+    :return: a generator of (index of the time step in load_profiles, dict of arrays), the arrays being the rows of
+    the arrays of runpp_timeseries for this time step
+    """
+    m_dot_loads = _load_m_dot(net, load_profiles, profile)
+    model = md.compile_model(net, t_grnd, solver, solver_options)
+
+    for t, step in enumerate(load_profiles.index):
+        logging.debug("TIMESERIES step {}".format(t))
+        yield step, model.solve_m_dot(m_dot_loads[t], model.p_feed)
+
+
+def runpp_timeseries(net, load_profiles, profile="scaling", t_grnd=10+273.15, solver="fsolve", solver_options=None):
+    """
+    Compute the pressures and mass flows of a given network for each time step of some load profiles
+
+    The network is compiled once for all the time steps (see model.compile_model), and each solve starts from the
+    solution of the previous time step. The results are stored in arrays, the res_* tables of the network are left
+    untouched.
+
+    :param net: the given network
+    :param load_profiles: a DataFrame with one row per time step and one column per load name, the loads without a
+    column keep the values of the load table
+    :param profile: "scaling" if the profiles are scaling factors of p_kW, "p_kW" if they replace p_kW (in [kW])
+    (default: "scaling")
+    :param t_grnd: temperature of the ground, used for the gas properties (in [K], default: 10°C)
+    :param solver: the solver, see runpp (default: "fsolve")
+    :param solver_options: the options of the solver, see runpp (default: None)
+    :return: a dict of arrays with one row per time step: "p_Pa" (one column per bus), "m_dot_pipe", "m_dot_feeder"
+    and "m_dot_station" (one column per pipe, feeder or station, in [kg/s], same signs as the res_* tables), the
+    columns following the row order of the tables
+    """
+    n_steps = len(load_profiles.index)
+    res = {
+        "p_Pa": np.zeros((n_steps, len(net.bus.index))),
+        "m_dot_pipe": np.zeros((n_steps, len(net.pipe.index))),
+        "m_dot_feeder": np.zeros((n_steps, len(net.feeder.index))),
+        "m_dot_station": np.zeros((n_steps, len(net.station.index))),
+    }
+
+    for t, (_, step) in enumerate(iter_timeseries(net, load_profiles, profile, t_grnd, solver, solver_options)):
+        for key, values in step.items():
+            res[key][t] = values
+
+    return res
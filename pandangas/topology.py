@@ -1,33 +1,154 @@
+import logging
+
+import numpy as np
+import pandas as pd
 import networkx as nx
+from scipy import sparse
 
 
-def create_nxgraph(net, only_in_service=True):
+def _positions(names, values):
     """
-    Convert a given network into a NetworkX MultiGraph
+    Return the positions of some values in an array of names (first one if a name is duplicated), -1 if missing
+
+    :param names: the array of names
+    :param values: the values to look for
+    :return: an array of positions
+    """
+    pos = pd.Series(np.arange(len(names)), index=names)
+    pos = pos.loc[~pos.index.duplicated()]
+    return pos.reindex(values).fillna(-1).values.astype(int)
+
+
+def _check_known_buses(positions, buses, what):
+    """
+    Check that the buses of some elements were all found in the bus table
+
+    :param positions: the positions of the buses, -1 if missing, see _positions
+    :param buses: the names of the buses
+    :param what: the kind of elements, for the error message
+    :return:
+    """
+    missing = pd.unique(np.asarray(buses, dtype=object)[positions < 0]).tolist()
+    try:
+        assert not missing
+    except AssertionError:
+        msg = "The buses {} of some {} do not exist !".format(missing, what)
+        logging.error(msg)
+        raise ValueError(msg)
+
+
+def create_topology(net, only_in_service=True):
+    """
+    Convert a given network into arrays: the buses are numbered by their position in the bus table, and the pipes and
+    stations are given as arrays of from/to bus numbers
 
     :param net: the given network
     :param only_in_service: if True, convert only the pipes that are in service (default: True)
-    :return: a MultiGraph
+    :return: a dict of arrays, with "bus_mask" and "pipe_mask" giving the buses and pipes of each pressure level
     """
+    bus_name = net.bus["name"].values
+    bus_level = net.bus["level"].values
 
-    g = nx.MultiDiGraph()
+    pipe_pos = np.arange(len(net.pipe.index))
+    if only_in_service:
+        pipe_pos = pipe_pos[(net.pipe["in_service"] != False).values]
+    pipes = net.pipe.iloc[pipe_pos]
 
-    for idx, row in net.bus.iterrows():
-        g.add_node(row[0], index=idx, level=row[1], zone=row[2], type=row[3])
+    pipe_from = _positions(bus_name, pipes["from_bus"].values)
+    pipe_to = _positions(bus_name, pipes["to_bus"].values)
+    station_from = _positions(bus_name, net.station["bus_high"].values)
+    station_to = _positions(bus_name, net.station["bus_low"].values)
+    _check_known_buses(np.concatenate((pipe_from, pipe_to)),
+                       np.concatenate((pipes["from_bus"].values, pipes["to_bus"].values)), "pipes")
+    _check_known_buses(np.concatenate((station_from, station_to)),
+                       np.concatenate((net.station["bus_high"].values, net.station["bus_low"].values)), "stations")
 
-    pipes = net.pipe
-    if only_in_service:
-        pipes = pipes.loc[pipes["in_service"] != False]
+    pipe_level = np.full(len(pipe_from), None, dtype=object)
+    pipe_level[pipe_from >= 0] = bus_level[pipe_from[pipe_from >= 0]]
+
+    return {
+        "bus_name": bus_name,
+        "bus_index": net.bus.index.values,
+        "bus_level": bus_level,
+        "bus_zone": net.bus["zone"].astype(object).where(net.bus["zone"].notnull(), None).values,
+        "bus_type": net.bus["type"].values,
+        "pipe_pos": pipe_pos,
+        "pipe_name": pipes["name"].values,
+        "pipe_index": pipes.index.values,
+        "pipe_from": pipe_from,
+        "pipe_to": pipe_to,
+        "pipe_length": pipes["length_m"].values.astype(float),
+        "pipe_diameter": pipes["diameter_m"].values.astype(float),
+        "pipe_material": pipes["material"].values,
+        "station_name": net.station["name"].values,
+        "station_index": net.station.index.values,
+        "station_from": station_from,
+        "station_to": station_to,
+        "station_p_lim_kW": net.station["p_lim_kW"].values,
+        "station_p_Pa": net.station["p_Pa"].values,
+        "bus_mask": {level: bus_level == level for level in pd.unique(bus_level)},
+        "pipe_mask": {level: pipe_level == level for level in pd.unique(bus_level)},
+    }
+
+
+def incidence_matrix(n_nodes, from_nodes, to_nodes):
+    """
+    Oriented node-pipe incidence matrix, -1 on the from node and +1 on the to node of each pipe, same as
+    networkx.incidence_matrix(graph, oriented=True)
+
+    :param n_nodes: the number of nodes
+    :param from_nodes: the number of the from node of each pipe
+    :param to_nodes: the number of the to node of each pipe
+    :return: a scipy.sparse CSR matrix
+    """
+    n_pipes = len(from_nodes)
+    rows = np.concatenate((from_nodes, to_nodes))
+    cols = np.concatenate((np.arange(n_pipes), np.arange(n_pipes)))
+    data = np.concatenate((-np.ones(n_pipes), np.ones(n_pipes)))
+    return sparse.csr_matrix((data, (rows, cols)), shape=(n_nodes, n_pipes))
+
+
+def nxgraph_from_topology(topo):
+    """
+    Convert the arrays given by create_topology into a NetworkX MultiDiGraph
+
+    :param topo: the arrays of the network
+    :return: a MultiDiGraph
+    """
+    g = nx.MultiDiGraph()
+
+    g.add_nodes_from(
+        (name, {"index": idx, "level": level, "zone": zone, "type": bus_type})
+        for name, idx, level, zone, bus_type in zip(
+            topo["bus_name"], topo["bus_index"], topo["bus_level"], topo["bus_zone"], topo["bus_type"]))
 
-    for idx, row in pipes.iterrows():
-        g.add_edge(row[1], row[2], name=row[0], index=idx, L_m=row[3], D_m=row[4], mat=row[5], type="PIPE")
+    names = topo["bus_name"]
+    g.add_edges_from(
+        (names[u], names[v], {"name": name, "index": idx, "L_m": l, "D_m": d, "mat": mat, "type": "PIPE"})
+        for u, v, name, idx, l, d, mat in zip(
+            topo["pipe_from"], topo["pipe_to"], topo["pipe_name"], topo["pipe_index"],
+            topo["pipe_length"], topo["pipe_diameter"], topo["pipe_material"]))
 
-    for idx, row in net.station.iterrows():
-        g.add_edge(row[1], row[2], name=row[0], index=idx, p_lim_kw=row[3], p_bar=row[4], type="STATION")
+    g.add_edges_from(
+        (names[u], names[v], {"name": name, "index": idx, "p_lim_kw": p_lim, "p_bar": p, "type": "STATION"})
+        for u, v, name, idx, p_lim, p in zip(
+            topo["station_from"], topo["station_to"], topo["station_name"], topo["station_index"],
+            topo["station_p_lim_kW"], topo["station_p_Pa"]))
 
     return g
 
 
+def create_nxgraph(net, only_in_service=True):
+    """
+    Convert a given network into a NetworkX MultiGraph
+
+    :param net: the given network
+    :param only_in_service: if True, convert only the pipes that are in service (default: True)
+    :return: a MultiGraph
+    """
+    return nxgraph_from_topology(create_topology(net, only_in_service))
+
+
 def graphs_by_level_as_dict(net):
     levels = net.bus["level"].unique()
     g = create_nxgraph(net)
@@ -1,4 +1,4 @@
-def get_index(value, df, col="name"):
+def get_index(value, df, col="name", index=None):
     """
     Return the index of an element in a DataFrame bus given a value and the name of the column to search for.
     Return a new index if the element doesn't exist yet
@@ -6,8 +6,15 @@ def get_index(value, df, col="name"):
     :param value: the value to look for
     :param df: the DataFrame to search in
     :param col: the name of the column
+    :param index: a dict mapping the values of the column to the index of the DataFrame, as kept by the network in
+    net.name_index, used instead of scanning the column when it is up to date (default: None)
     :return:
     """
+    if index is not None:
+        idx = index.get(value)
+        if idx is not None and idx in df.index and df.at[idx, col] == value:
+            return idx
+
     if value in df[col].unique():
         idx = df.index[df[col] == value].tolist()[0]
 
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pandangas as pg
+import pandangas.aio as aio
+import pandangas.simulation as sim
+
+from tests.test_core import fix_create
+
+
+def test_runpp_async_same_as_runpp(fix_create):
+    net = fix_create
+    levels = []
+    asyncio.run(pg.runpp_async(net, timeout=60.0, use_cache=False,
+                               callback=lambda stats: levels.append(stats["level"])))
+    p_async = net.res_bus["p_Pa"].copy()
+    assert levels == ["BP", "MP"]
+
+    pg.runpp(net, use_cache=False)
+    assert p_async.equals(net.res_bus["p_Pa"])
+
+
+def test_stream_runpp_levels(fix_create):
+    net = fix_create
+
+    async def _collect():
+        return [level async for level in pg.stream_runpp(net, solver="newton")]
+
+    levels = asyncio.run(_collect())
+    assert [level["level"] for level in levels] == ["BP", "MP"]
+    assert levels[0]["res_bus"]["name"].tolist() == ["BUS1", "BUS2", "BUS3"]
+    assert len(levels[1]["res_station"].index) == 0 and len(levels[0]["res_station"].index) == 1
+    assert len(net.res_bus.index) == 5
+
+
+def test_iter_runpp_closed_early_leaves_tables(fix_create):
+    net = fix_create
+    pg.runpp(net)
+    res_bus, res_station = net.res_bus.copy(), net.res_station.copy()
+
+    net.load.loc[0, "p_kW"] = 20.0
+    levels = pg.iter_runpp(net)
+    assert next(levels)["level"] == "BP"
+    levels.close()
+    assert net.res_bus.equals(res_bus)
+    assert net.res_station.equals(res_station)
+
+
+def test_stream_timeseries(fix_create):
+    net = fix_create
+    profiles = pd.DataFrame({"LOAD2": [1.0, 0.5, 1.0]}, index=["t0", "t1", "t2"])
+
+    async def _collect():
+        return [step async for step in pg.stream_timeseries(net, profiles, solver="newton")]
+
+    steps = asyncio.run(_collect())
+    ts = pg.runpp_timeseries(net, profiles, solver="newton")
+    assert [step for step, _ in steps] == ["t0", "t1", "t2"]
+    assert np.allclose(np.array([res["p_Pa"] for _, res in steps]), ts["p_Pa"])
+
+
+def _slow_steps(started, closed):
+    try:
+        for i in range(100):
+            started.set()
+            threading.Event().wait(0.05)
+            yield i
+    finally:
+        closed.set()
+
+
+def test_iterate_timeout_and_cancel():
+    started, closed = threading.Event(), threading.Event()
+
+    async def _consume(timeout):
+        return [i async for i in aio.iterate(_slow_steps(started, closed), timeout=timeout)]
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(_consume(0.12))
+    assert closed.is_set()
+
+    async def _cancel():
+        task = asyncio.ensure_future(_consume(None))
+        await asyncio.sleep(0.12)
+        task.cancel()
+        await task
+
+    started.clear()
+    closed.clear()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_cancel())
+    assert started.is_set() and closed.is_set()
+
+
+def test_runpp_async_timeout_leaves_tables(fix_create, monkeypatch):
+    net = fix_create
+    pg.runpp(net)
+    res_bus, res_station = net.res_bus.copy(), net.res_station.copy()
+
+    solve_level = sim._solve_level
+
+    def _slow_solve_level(*args, **kwargs):
+        threading.Event().wait(0.2)
+        return solve_level(*args, **kwargs)
+
+    monkeypatch.setattr(sim, "_solve_level", _slow_solve_level)
+    net.load.loc[0, "p_kW"] = 20.0
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(pg.runpp_async(net, timeout=0.1))
+    assert net.res_bus.equals(res_bus)
+    assert net.res_station.equals(res_station)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import pandangas as pg
+import pandangas.results as res
+
+from tests.test_core import fix_create
+
+
+SCENARIOS = [
+    {},
+    {"load": {"scaling": {"LOAD2": 2.0, "LOAD3": 0.5}}},
+    {"pipe": {"in_service": {"PIPE3": False}}},
+]
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_run_scenarios(fix_create, n_workers):
+    net = fix_create
+    batch = pg.run_scenarios(net, SCENARIOS, n_workers=n_workers)
+    assert batch["p_Pa"].shape == (3, 5)
+    assert batch["m_dot_pipe"].shape == (3, 4)
+    assert batch["m_dot_pipe"][2, 3] == 0.0
+    assert net.load["scaling"].tolist() == [1.0, 1.0]
+    assert len(net.res_bus.index) == 0
+
+    res.runpp(net)
+    assert np.array_equal(batch["p_Pa"][0], net.res_bus["p_Pa"].reindex(net.bus.index).values.astype(float))
+    assert np.array_equal(batch["m_dot_station"][0], net.res_station["m_dot_kg/s"].values.astype(float))
+
+    net.load["scaling"] = [2.0, 0.5]
+    res.runpp(net)
+    assert np.array_equal(batch["p_Pa"][1], net.res_bus["p_Pa"].reindex(net.bus.index).values.astype(float))
+
+
+def test_run_scenarios_unknown_element_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.run_scenarios(net, [{"load": {"scaling": {"LOADX": 2.0}}}], n_workers=1)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import pandangas as pg
+import pandangas.contingency as cont
+
+from tests.test_core import fix_create
+
+
+@pytest.fixture()
+def fix_create_radial_end(fix_create):
+    net = fix_create
+    pg.create_bus(net, level="BP", name="BUS4")
+    pg.create_pipe(net, "BUS3", "BUS4", length_m=100, diameter_m=0.05, name="PIPE4")
+    pg.create_load(net, "BUS4", p_kW=5.0, name="LOAD4")
+    net.load["min_p_Pa"] = 1500.0  # the base case is clean, only the outages give violations
+    return net
+
+
+def test_islanded_buses(fix_create_radial_end):
+    net = fix_create_radial_end
+    assert cont._islanded_buses(net) == []
+    net.pipe.at[4, "in_service"] = False
+    assert cont._islanded_buses(net) == ["BUS4"]
+    cont._remove_station(net, "STATION")
+    assert set(cont._islanded_buses(net)) == {"BUS1", "BUS2", "BUS3", "BUS4"}
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_run_contingencies(fix_create_radial_end, n_workers):
+    net = fix_create_radial_end
+    pg.runpp(net)
+    assert net.res_load["p_ok"].all()
+
+    table = pg.run_contingencies(net, n_workers=n_workers)
+    assert table["name"].tolist() == ["PIPE0", "PIPE1", "PIPE2", "PIPE3", "PIPE4", "STATION"]
+    assert table["islanded_loads"].tolist() == [3, 0, 0, 0, 1, 3]
+    assert np.isnan(table.at[5, "min_p_Pa"])
+    assert table.at[4, "min_p_Pa"] == 1827.8
+    assert table["p_violations"].tolist() == [0, 3, 3, 2, 0, 0]
+    assert net.res_load["p_ok"].all()
+    assert net.pipe["in_service"].all()
+
+
+def test_run_contingencies_unknown_pipe_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.run_contingencies(net, pipes=["PIPEX"], n_workers=1)
@@ -1,4 +1,5 @@
 import pytest
+import pandas as pd
 
 import pandangas as pg
 
@@ -89,3 +90,146 @@ def test_network_repr(fix_create):
     assert "This pandangas network includes the following parameter tables:" in repr(net)
     assert "- bus (5 elements)" in repr(net)
     assert "and the following results tables:" not in repr(net)
+
+
+@pytest.fixture()
+def fix_create_bulk():
+    net = pg.create_empty_network()
+
+    pg.create_buses(net, level=["MP", "MP", "BP", "BP", "BP"], name=["BUSF", "BUS0", "BUS1", "BUS2", "BUS3"])
+
+    pg.create_loads(net, ["BUS2", "BUS3"], p_kW=[10.0, 15.0], name=["LOAD2", "LOAD3"])
+
+    pipes = pd.DataFrame({
+        "from_bus": ["BUSF", "BUS1", "BUS1", "BUS2"],
+        "to_bus": ["BUS0", "BUS2", "BUS3", "BUS3"],
+        "length_m": [100, 400, 500, 500],
+        "diameter_m": 0.05,
+        "name": ["PIPE0", "PIPE1", "PIPE2", "PIPE3"],
+    })
+    pg.create_pipes(net, **pipes)
+
+    pg.create_stations(net, ["BUS0"], ["BUS1"], p_lim_kW=50, p_Pa=0.025E5, name=["STATION"])
+    pg.create_feeders(net, ["BUSF"], p_lim_kW=50, p_Pa=0.9E5, name=["FEEDER"])
+
+    return net
+
+
+def test_bulk_creation_same_as_single(fix_create, fix_create_bulk):
+    net, net_bulk = fix_create, fix_create_bulk
+    for tb in ["bus", "pipe", "load", "feeder", "station"]:
+        assert getattr(net, tb).astype(object).equals(getattr(net_bulk, tb).astype(object))
+
+
+def test_bulk_bus_creation_bad_bus_level_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.create_buses(net, level=["BP", "XX"], name=["BUSX", "BUSY"])
+    assert len(net.bus.index) == 5
+
+
+def test_bulk_pipe_creation_non_existing_bus_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.create_pipes(net, ["BUS1", "BUS1"], ["BUS2", "BUSX"], length_m=100, diameter_m=0.05, name=["P1", "P2"])
+    assert len(net.pipe.index) == 4
+
+
+def test_bulk_pipe_creation_different_levels_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.create_pipes(net, ["BUS1", "BUS0"], ["BUS2", "BUS1"], length_m=100, diameter_m=0.05, name=["P1", "P2"])
+    assert len(net.pipe.index) == 4
+
+
+def test_many_loads_per_bus(fix_create):
+    net = fix_create
+    pg.create_bus(net, level="BP", name="BUS4")
+    pg.create_loads(net, ["BUS4", "BUS4", "BUS2"], p_kW=10.0, name=["LOAD4", "LOAD5", "LOAD6"])
+    pg.create_load(net, "BUS4", p_kW=10.0, name="LOAD7")
+    assert len(net.load.index) == 6
+    assert net.bus["type"].tolist() == ["SRCE", "SINK", "SRCE", "SINK", "SINK", "SINK"]
+
+
+def test_load_on_srce_or_station_bus_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.create_loads(net, ["BUS2", "BUS1"], p_kW=10.0, name=["LOAD4", "LOAD5"])
+    with pytest.raises(ValueError):
+        pg.create_load(net, "BUS0", p_kW=10.0, name="LOAD4")
+    assert len(net.load.index) == 2
+
+
+def test_name_index(fix_create, fix_create_bulk):
+    for net in [fix_create, fix_create_bulk]:
+        assert net.name_index["bus"] == {"BUSF": 0, "BUS0": 1, "BUS1": 2, "BUS2": 3, "BUS3": 4}
+        assert net.name_index["pipe"]["PIPE3"] == 3
+        assert net.name_index["load"] == {"LOAD2": 0, "LOAD3": 1}
+        assert net.name_index["feeder"] == {"FEEDER": 0}
+        assert net.name_index["station"] == {"STATION": 0}
+
+
+def test_get_index_with_name_index(fix_create):
+    net = fix_create
+    assert pg.get_index("BUS2", net.bus, index=net.name_index["bus"]) == 3
+    assert pg.get_index("BUSX", net.bus, index=net.name_index["bus"]) == 5
+
+    net.bus = net.bus.iloc[::-1].reset_index(drop=True)
+    assert pg.get_index("BUS2", net.bus, index=net.name_index["bus"]) == 1
+
+    pg.core._rebuild_name_index(net)
+    assert net.name_index["bus"]["BUS2"] == 1
+
+
+def _follows_schema(net, table):
+    df = getattr(net, table)
+    schema = pg.core.SCHEMAS[table]
+    return df.columns.tolist() == list(schema) and all(df[col].dtype == dtype for col, dtype in schema.items())
+
+
+def test_tables_follow_schemas(fix_create, fix_create_bulk):
+    assert all(_follows_schema(pg.create_empty_network(), table) for table in pg.core.SCHEMAS)
+
+    for net in [fix_create, fix_create_bulk]:
+        pg.create_pipe(net, "BUS2", "BUS3", length_m=10, diameter_m=0.05, name="PIPE4", material="pe")
+        assert all(_follows_schema(net, table) for table in pg.core.SCHEMAS)
+        assert net.pipe["material"].cat.categories.tolist() == ["steel", "pe"]
+        assert net.bus["type"].cat.categories.tolist() == list(pg.core.BUS_TYPES)
+
+        pg.runpp(net)
+        assert all(_follows_schema(net, table) for table in pg.core.SCHEMAS)
+
+
+def test_bus_checks_with_tables_edited_by_hand(fix_create):
+    net = fix_create
+    net.bus = net.bus.iloc[::-1].reset_index(drop=True)
+    net.bus.loc[net.bus["name"] == "BUS3", "name"] = "BUS3B"
+
+    pg.create_pipe(net, "BUS2", "BUS3B", length_m=10, diameter_m=0.05, name="PIPE4")
+    with pytest.raises(ValueError):
+        pg.create_pipe(net, "BUS2", "BUS3", length_m=10, diameter_m=0.05, name="PIPE5")
+    with pytest.raises(ValueError):
+        pg.core._check_level(net, "BUS2", "BUSX")
+    with pytest.raises(ValueError):
+        pg.create_pipes(net, ["BUS2"], ["BUS3"], length_m=10, diameter_m=0.05, name=["PIPE5"])
+
+    pg.create_bus(net, level="BP", name="BUS4")
+    pg.create_load(net, "BUS4", p_kW=1.0, name="LOAD4")
+    assert net.bus.set_index("name").at["BUS4", "type"] == "SINK"
+    assert net.bus.set_index("name").at["BUS2", "type"] == "SINK"
+
+
+def test_edit_categorical_columns(fix_create):
+    net = fix_create
+    pg.add_categories(net, "pipe", "material", ["pe"])
+    pg.add_categories(net, "bus", "zone", ["Z1", "Z2"])
+    pg.add_categories(net, "bus", "level", ["HP"])
+    net.pipe.loc[0, "material"] = "pe"
+    net.bus.loc[0, "zone"] = "Z1"
+    net.bus.loc[[0, 1], "level"] = "HP"
+    assert net.pipe.at[0, "material"] == "pe" and net.bus.at[0, "zone"] == "Z1"
+    assert net.bus["level"].tolist() == ["HP", "HP", "BP", "BP", "BP"]
+    assert net.bus["zone"].dtype == "category" and net.pipe["material"].dtype == "category"
+
+    with pytest.raises(ValueError):
+        pg.add_categories(net, "pipe", "length_m", [1.0])
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import fluids
+import fluids.friction
+
+import pandangas as pg
+import pandangas.friction as fr
+
+from tests.test_core import fix_create
+
+
+def test_clamond_same_as_fluids():
+    re = np.logspace(3.4, 8, 20)
+    fd, _ = fr.friction_factor(re, 1E-4)
+    assert np.allclose(fd, [fluids.friction.Clamond(r, 1E-4) for r in re], rtol=1E-12)
+
+
+@pytest.mark.parametrize("correlation", fr.CORRELATIONS)
+def test_friction_factor_derivative(correlation):
+    re = np.logspace(3.4, 8, 20)
+    fd, re_dfd = fr.friction_factor(re, 1E-4, correlation)
+    h = 1E-6
+    num = (fr.friction_factor(re*(1 + h), 1E-4, correlation)[0] - fr.friction_factor(re*(1 - h), 1E-4, correlation)[0])
+    assert np.allclose(re_dfd, num / (2*h), rtol=1E-5)
+
+
+@pytest.mark.parametrize("correlation", fr.CORRELATIONS)
+@pytest.mark.parametrize("blend", [None, (2000.0, 4000.0)])
+def test_dp_from_m_dot_derivative(correlation, blend):
+    m_dot = np.concatenate((np.linspace(-0.05, 0.05, 41), [0.0]))
+    dp, ddp = fr.dp_from_m_dot(m_dot, 100.0, 0.1, 1E-5, 0.8, 1.1E-5, correlation, blend)
+    assert np.allclose(dp, -fr.dp_from_m_dot(-m_dot, 100.0, 0.1, 1E-5, 0.8, 1.1E-5, correlation, blend)[0])
+    assert dp[-1] == 0 and ddp[-1] > 0
+
+    h = 1E-9
+    num = (fr.dp_from_m_dot(m_dot + h, 100.0, 0.1, 1E-5, 0.8, 1.1E-5, correlation, blend)[0] -
+           fr.dp_from_m_dot(m_dot - h, 100.0, 0.1, 1E-5, 0.8, 1.1E-5, correlation, blend)[0]) / (2*h)
+    assert np.allclose(ddp, num, rtol=1E-4)
+
+
+def test_material_roughness_cached():
+    fr.material_roughness.cache_clear()
+    assert fr.material_roughness("steel") == fluids.material_roughness("steel")
+    fr.material_roughness("steel")
+    assert fr.material_roughness.cache_info().hits == 1
+
+
+def test_runpp_friction_correlation(fix_create):
+    net = fix_create
+    pg.runpp(net)
+    p_ref = net.res_bus["p_Pa"].copy()
+
+    net.FRICTION = "haaland"
+    net.RE_BLEND = (2000.0, 4000.0)
+    pg.runpp(net)
+    assert np.allclose(net.res_bus["p_Pa"], p_ref)  # laminar flows
+
+    # turbulent flows: Re from about 7000 to 15000 in all the pipes but PIPE3
+    net.RE_BLEND = None
+    net.load["p_kW"] *= 10
+    net.station["p_Pa"] = 0.5E5
+    p = {}
+    for correlation in fr.CORRELATIONS:
+        net.FRICTION = correlation
+        pg.runpp(net)
+        p[correlation] = net.res_bus["p_Pa"].values
+    assert (p["clamond"] > 0).all()
+    assert not np.allclose(p["swamee_jain"], p["clamond"], rtol=1E-3)
+    assert not np.allclose(p["haaland"], p["clamond"], rtol=1E-3)
+    assert np.allclose(p["haaland"], p["clamond"], rtol=2E-2)  # within a few % of Colebrook
+
+    net.FRICTION = "XX"
+    with pytest.raises(ValueError):
+        pg.runpp(net)
@@ -0,0 +1,29 @@
+import numpy as np
+
+import pandangas as pg
+import pandangas.generators as gen
+
+
+def test_create_radial_network():
+    net = gen.create_radial_network(40)
+    assert len(net.bus.index) == 40
+    assert len(net.pipe.index) == 39
+    assert len(net.load.index) == 39
+    pg.runpp(net)
+    assert np.all(net.res_bus["p_Pa"] <= net.LEVELS["BP"])
+
+
+def test_create_grid_network():
+    net = gen.create_grid_network(4, 5)
+    assert len(net.bus.index) == 20
+    assert len(net.pipe.index) == 4 * 4 + 3 * 5
+    pg.runpp(net)
+    assert len(net.res_pipe.index) == 31
+
+
+def test_create_multi_level_network():
+    net = gen.create_multi_level_network(3, 9, district="grid")
+    assert net.bus["level"].value_counts().to_dict() == {"BP": 27, "MP": 4}
+    assert len(net.station.index) == 3
+    pg.runpp(net)
+    assert np.allclose(net.res_station["m_dot_kg/s"], net.res_station.at[0, "m_dot_kg/s"])
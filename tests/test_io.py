@@ -0,0 +1,102 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import pandangas as pg
+import pandangas.file_io as fio
+
+from tests.test_core import fix_create
+
+
+def test_save_load_network(fix_create, tmp_path):
+    net = fix_create
+    pg.runpp(net)
+    pg.save_network(net, tmp_path / "net")
+
+    net2 = pg.load_network(tmp_path / "net")
+    for table in net.keys:
+        df, df2 = getattr(net, table), getattr(net2, table)
+        assert df.columns.tolist() == df2.columns.tolist()
+        assert df.index.tolist() == df2.index.tolist()
+        assert df.astype(object).equals(df2.astype(object))
+    assert net2.pipe["length_m"].dtype == net.pipe["length_m"].dtype
+    assert net2.pipe["in_service"].dtype == bool
+    assert net2.bus["level"].dtype == "category" and net2.bus["type"].dtype == net.bus["type"].dtype
+    assert pd.isnull(net2.bus.at[0, "zone"])
+    assert net2.name_index == net.name_index
+
+    pg.runpp(net2)
+    assert net2.res_bus.equals(net.res_bus)
+
+
+def test_save_load_bool_column_with_nulls(fix_create, tmp_path):
+    net = fix_create
+    net.pipe["checked"] = np.array([True, None, False, True], dtype=object)
+    pg.save_network(net, tmp_path / "net")
+
+    net2 = pg.load_network(tmp_path / "net", mmap=True)
+    assert net2.pipe["checked"].tolist() == [True, None, False, True]
+
+
+def test_save_load_network_settings(fix_create, tmp_path):
+    net = fix_create
+    net.LEVELS = dict(net.LEVELS, BP=0.03E5)
+    net.LHV = 10E3
+    net.FRICTION = "haaland"
+    net.RE_BLEND = (2000.0, 4000.0)
+    pg.runpp(net)
+    pg.save_network(net, tmp_path / "net")
+
+    net2 = pg.load_network(tmp_path / "net")
+    for key in fio.SETTINGS:
+        assert getattr(net2, key) == getattr(net, key)
+    pg.runpp(net2)
+    assert net2.res_pipe.equals(net.res_pipe)
+
+
+def test_save_load_non_string_categories(fix_create, tmp_path):
+    net = fix_create
+    pg.create_bus(net, level="BP", name="BUS4", zone=1)
+    pg.create_bus(net, level="BP", name="BUS5", zone=2)
+    pg.save_network(net, tmp_path / "net")
+
+    net2 = pg.load_network(tmp_path / "net")
+    assert net2.bus["zone"].tolist()[-2:] == [1, 2] and net2.bus.at[5, "zone"] == net.bus.at[5, "zone"]
+    assert net2.bus["zone"].dtype == "category"
+
+    pg.create_bus(net, level="BP", name="BUS6", zone="Z1")
+    with pytest.raises(ValueError):
+        pg.save_network(net, tmp_path / "net_mixed")
+
+
+def test_load_network_mmap(fix_create, tmp_path):
+    net = fix_create
+    pg.save_network(net, tmp_path / "net")
+    net2 = pg.load_network(tmp_path / "net", mmap=True)
+    assert isinstance(net2.pipe["length_m"].values, np.memmap)
+
+    net2.pipe.at[0, "length_m"] = 200
+    pg.create_bus(net2, level="BP", name="BUS4")
+    pg.create_pipe(net2, "BUS3", "BUS4", length_m=100, diameter_m=0.05, name="PIPE4")
+    pg.runpp(net2)
+    assert pg.load_network(tmp_path / "net").pipe.at[0, "length_m"] == 100
+
+
+def test_save_load_results(tmp_path):
+    results = {"p_Pa": np.arange(6.0).reshape(2, 3), "m_dot_pipe": np.zeros((2, 0))}
+    pg.save_results(results, tmp_path / "res")
+    loaded = pg.load_results(tmp_path / "res", mmap=True)
+    assert isinstance(loaded["p_Pa"], np.memmap)
+    assert np.array_equal(loaded["p_Pa"], results["p_Pa"])
+    assert loaded["m_dot_pipe"].shape == (2, 0)
+
+
+def test_load_bad_version_raise_exception(fix_create, tmp_path):
+    pg.save_network(fix_create, tmp_path / "net")
+    with open(os.path.join(tmp_path / "net", fio.META_FILE), "w") as f:
+        json.dump({"version": 0}, f)
+    with pytest.raises(ValueError):
+        pg.load_network(tmp_path / "net")
@@ -0,0 +1,53 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import pandangas as pg
+
+from tests.test_core import fix_create
+
+
+def test_compile_solve_same_as_runpp(fix_create):
+    net = fix_create
+    model = pg.compile_model(net, solver="newton")
+    res = model.solve()
+
+    pg.runpp(net, solver="newton")
+    assert np.allclose(res["p_Pa"], net.res_bus.sort_index()["p_Pa"].values.astype(float), rtol=1E-3)
+    assert np.allclose(res["m_dot_pipe"], net.res_pipe.sort_index()["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+    assert np.allclose(res["m_dot_station"], net.res_station["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+
+
+def test_model_solve_loads_and_p_feed(fix_create):
+    net = fix_create
+    model = pg.compile_model(net)
+    p_kw = (net.load["p_kW"] * net.load["scaling"]).sum()
+
+    res = model.solve(loads={"LOAD2": 20.0}, p_feed={"FEEDER": 0.9E5})
+    same = model.solve(loads=[20.0, net.load.at[1, "p_kW"]], p_feed=[0.9E5])
+    assert np.allclose(res["p_Pa"], same["p_Pa"])
+
+    net.load.loc[0, "p_kW"] = 20.0
+    net.feeder.loc[0, "p_Pa"] = 0.9E5
+    pg.runpp(net)
+    assert np.allclose(res["p_Pa"], net.res_bus.sort_index()["p_Pa"].values.astype(float), rtol=1E-3)
+    assert np.allclose(res["m_dot_feeder"], net.res_feeder["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+
+    # the network is not read again by the model
+    assert np.isclose(-model.solve()["m_dot_feeder"][0] * net.LHV, p_kw)
+
+
+def test_model_solve_wrong_inputs_raise_exception(fix_create):
+    model = pg.compile_model(fix_create)
+    with pytest.raises(ValueError):
+        model.solve(loads={"LOADX": 1.0})
+    with pytest.raises(ValueError):
+        model.solve(p_feed=[1.0E5, 0.9E5])
+
+
+def test_model_pickle(fix_create):
+    model = pg.compile_model(fix_create, solver="newton", solver_options={"reduce": True})
+    res = model.solve(loads={"LOAD2": 12.0})
+    model2 = pickle.loads(pickle.dumps(model))
+    assert np.allclose(model2.solve(loads={"LOAD2": 12.0})["p_Pa"], res["p_Pa"])
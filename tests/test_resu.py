@@ -1,3 +1,8 @@
+import numpy as np
+import pandas as pd
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
 import pandangas as pg
 import pandangas.simulation as sim
 import pandangas.results as res
@@ -13,6 +18,42 @@ def test_runpp(fix_create):
     assert net.res_bus.at[idx, "p_Pa"] == 1962.7
 
 
+def test_runpp_newton(fix_create):
+    net = fix_create
+    res.runpp(net, solver="newton")
+    assert len(net.res_bus.index) == 5
+    idx = net.res_bus.index[net.res_bus["name"] == "BUS2"].tolist()[0]
+    assert net.res_bus.at[idx, "p_Pa"] == 1962.7
+
+
+@pytest.mark.parametrize("solver", ["hybr", "lm", "krylov", "loop"])
+def test_runpp_solvers(fix_create, solver):
+    net = fix_create
+    res.runpp(net, solver=solver)
+    idx = net.res_bus.index[net.res_bus["name"] == "BUS2"].tolist()[0]
+    assert net.res_bus.at[idx, "p_Pa"] == 1962.7
+
+
+def test_runpp_solver_options(fix_create):
+    net = fix_create
+    calls = []
+
+    def _precond(jac):
+        calls.append(jac.shape)
+        return sim._ilu_precond(jac)
+
+    res.runpp(net, solver="krylov", solver_options={"tol": 1E-12, "max_iter": 50, "precond": _precond})
+    assert len(calls) == net.res_stats.at[0, "n_iter"]
+    assert calls[0] == (9, 9)
+    assert net.res_stats.at[0, "residual"] <= 1E-6
+
+    with pytest.warns(RuntimeWarning):
+        res.runpp(net, solver="fsolve", solver_options={"max_iter": 2}, use_cache=False)
+
+    with pytest.raises(ValueError):
+        res.runpp(net, solver_options={"xtol": 1E-6})
+
+
 def test_len_of_created_df(fix_create):
     net = fix_create
     res.runpp(net)
@@ -29,3 +70,186 @@ def test_columns_of_created_df(fix_create):
     assert set(net.res_pipe.columns) == {"name", "m_dot_kg/s", "v_m/s", "p_kW", "loading_%"}
     assert set(net.res_feeder.columns) == {"name", "m_dot_kg/s", "p_kW", "loading_%"}
     assert set(net.res_station.columns) == {"name", "m_dot_kg/s", "p_kW", "loading_%"}
+
+
+def test_runpp_init_results(fix_create):
+    net = fix_create
+    res.runpp(net, use_cache=False)
+    p_flat = net.res_bus.copy()
+    n_fev_flat = net.res_stats["n_fev"].sum()
+    res.runpp(net, init="results", use_cache=False)
+    assert net.res_bus.equals(p_flat)
+    assert net.res_stats["n_fev"].sum() < n_fev_flat
+    res.runpp(net, init="results", solver="newton")
+    assert net.res_bus.equals(p_flat)
+
+    net.pipe.at[3, "in_service"] = False
+    res.runpp(net, init="results")
+    p_results = net.res_bus.copy()
+    res.runpp(net)
+    assert net.res_bus.equals(p_results)
+    assert net.res_pipe.at[3, "m_dot_kg/s"] == 0.0
+
+    # the zero flow of the pipe is kept as initial guess, the new pipe starts from the flat guess
+    pg.create_pipe(net, "BUS1", "BUS3", length_m=100, diameter_m=0.05, name="PIPE4")
+    net.pipe.at[3, "in_service"] = True
+    lev = sim._compile_level(net, "BP")
+    x0 = sim._init_variables_from_results(lev, net.LEVELS["BP"], net.res_bus, net.res_pipe)
+    assert x0[3 + lev["pipes"].index("PIPE3")] == 0.0
+    assert x0[3 + lev["pipes"].index("PIPE4")] == 0.002
+
+
+def test_runpp_bad_init_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        res.runpp(net, init="XX")
+
+
+def test_runpp_cache_only_solves_changed_levels(fix_create, monkeypatch):
+    net = fix_create
+    solved = []
+    solve = sim._solve
+
+    def _counting_solve(args, x0, solver="fsolve", options=None):
+        solved.append(len(x0))
+        return solve(args, x0, solver, options)
+
+    monkeypatch.setattr(sim, "_solve", _counting_solve)
+
+    res.runpp(net, use_cache=True)
+    assert len(solved) == 2
+    p_first = net.res_bus.copy()
+
+    res.runpp(net, use_cache=True)
+    assert len(solved) == 2
+    assert net.res_bus.equals(p_first)
+
+    net.pipe.at[0, "length_m"] = 200
+    res.runpp(net, use_cache=True)
+    assert len(solved) == 3
+
+    net.load.at[0, "p_kW"] = 12.0
+    res.runpp(net, use_cache=True)
+    assert len(solved) == 5
+
+    res.runpp(net)
+    assert len(solved) == 7
+
+
+def test_runpp_cache_sees_lhv(fix_create):
+    net = fix_create
+    res.runpp(net, use_cache=True)
+    m_dot = net.res_pipe["m_dot_kg/s"].copy()
+
+    net.LHV = 10E3
+    res.runpp(net, use_cache=True)
+    assert not net.res_stats["cached"].any()
+    cached = net.res_pipe.copy()
+    assert not cached["m_dot_kg/s"].equals(m_dot)
+
+    res.runpp(net)
+    assert net.res_pipe.equals(cached)
+
+
+def test_runpp_failed_level_leaves_tables(fix_create, monkeypatch):
+    net = fix_create
+    res.runpp(net)
+    res_bus, res_station = net.res_bus.copy(), net.res_station.copy()
+
+    solve_level = sim._solve_level
+    calls = []
+
+    def _failing_solve_level(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise ValueError("solver failure")
+        return solve_level(*args, **kwargs)
+
+    monkeypatch.setattr(sim, "_solve_level", _failing_solve_level)
+    net.load.loc[0, "p_kW"] = 50.0
+    with pytest.raises(ValueError):
+        res.runpp(net)
+    assert net.res_bus.equals(res_bus)
+    assert net.res_station.equals(res_station)
+
+
+def test_runpp_pipe_station_feeder_results(fix_create):
+    net = fix_create
+    pg.create_pipe(net, "BUS1", "BUS2", length_m=400, diameter_m=0.02, name="OLD_PIPE", in_service=False)
+    res.runpp(net)
+    assert net.res_pipe.at[1, "m_dot_kg/s"] == 0.000328
+    assert net.res_pipe.at[1, "loading_%"] == 490.3
+    assert net.res_pipe.at[4, "m_dot_kg/s"] == 0.0
+    assert net.res_station.at[0, "m_dot_kg/s"] == 0.000656
+    assert net.res_station.at[0, "loading_%"] == 50.0
+    assert net.res_feeder.at[0, "m_dot_kg/s"] == -0.000656
+
+
+def test_runpp_independent_districts(fix_create):
+    net = fix_create
+    pg.runpp(net)
+    ref = net.res_bus.set_index("name")["p_Pa"]
+
+    pg.create_bus(net, level="MP", name="BUS4")
+    pg.create_pipe(net, "BUS0", "BUS4", length_m=100, diameter_m=0.05, name="PIPE4")
+    pg.create_buses(net, level="BP", name=["BUS5", "BUS6", "BUS7"])
+    pg.create_load(net, "BUS6", p_kW=10.0, name="LOAD6")
+    pg.create_load(net, "BUS7", p_kW=15.0, name="LOAD7")
+    pg.create_pipes(net, ["BUS5", "BUS5", "BUS6"], ["BUS6", "BUS7", "BUS7"], length_m=[400, 500, 500],
+                    diameter_m=0.05, name=["PIPE5", "PIPE6", "PIPE7"])
+    pg.create_station(net, "BUS4", "BUS5", p_lim_kW=50, p_Pa=0.025E5, name="STATION2")
+
+    lev = sim._compile_level(net, "BP")
+    assert lev["components"].max() == 1
+
+    pg.runpp(net, use_cache=False)
+    seq = net.res_bus.copy()
+    p = seq.set_index("name")["p_Pa"]
+    for a, b in zip(["BUS1", "BUS2", "BUS3"], ["BUS5", "BUS6", "BUS7"]):
+        assert p[b] == p[a]
+        assert p[a] == ref[a]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pg.runpp(net, use_cache=False, executor=executor)
+    assert net.res_bus.equals(seq)
+
+
+def test_runpp_stats_and_callback(fix_create):
+    net = fix_create
+    seen = []
+    res.runpp(net, solver="newton", callback=seen.append)
+    stats = net.res_stats
+    assert stats["level"].tolist() == ["BP", "MP"]
+    assert [s["level"] for s in seen] == ["BP", "MP"]
+    assert stats["n_nodes"].tolist() == [3, 2]
+    assert not stats["cached"].any()
+    assert stats.at[0, "n_iter"] > 0 and stats.at[0, "n_jev"] == stats.at[0, "n_iter"]
+    assert stats.at[1, "n_iter"] == 0  # radial
+    assert (stats["residual"] < 1E-6).all()
+    assert (stats[["compile_s", "solve_s", "results_s"]] >= 0).all().all()
+
+    res.runpp(net, solver="newton", use_cache=True)
+    res.runpp(net, solver="newton", use_cache=True)
+    assert net.res_stats["cached"].all()
+    assert (net.res_stats["n_fev"] == 0).all()
+
+
+def test_runpp_many_loads_per_bus(fix_create):
+    net = fix_create
+    res.runpp(net)
+    p_ref = net.res_bus["p_Pa"].copy()
+
+    # LOAD2 (10 kW) split into 4 connections
+    net.load.loc[0, "p_kW"] = 4.0
+    pg.create_loads(net, "BUS2", p_kW=[1.0, 2.0, 3.0], name=["LOAD2A", "LOAD2B", "LOAD2C"], min_p_Pa=[0, 0, 1E5])
+    assert sim._scaled_loads_as_dict(net)["BUS2"] == round(10.0 / net.LHV, 6)
+    res.runpp(net)
+    assert p_ref.equals(net.res_bus["p_Pa"])
+
+    assert net.res_load["name"].tolist() == ["LOAD2", "LOAD3", "LOAD2A", "LOAD2B", "LOAD2C"]
+    assert (net.res_load.loc[[0, 2, 3, 4], "p_Pa"] == net.res_bus.set_index("name").at["BUS2", "p_Pa"]).all()
+    assert net.res_load["p_kW"].sum() == 25.0
+    assert net.res_load["p_ok"].tolist() == [False, False, True, True, False]  # default min_p_Pa: 2200 Pa
+
+    ts = pg.runpp_timeseries(net, pd.DataFrame({"LOAD2A": [1.0]}))
+    assert np.allclose(ts["p_Pa"][0], net.res_bus.sort_index()["p_Pa"].values, rtol=1E-3)
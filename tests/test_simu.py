@@ -4,6 +4,7 @@ import pandangas.simulation as sim
 import pandangas.topology as top
 
 import pytest
+from scipy import sparse
 
 import fluids
 from thermo.chemical import Chemical
@@ -30,10 +31,21 @@ def test_i_mat(fix_create):
     net = fix_create
     g = top.graphs_by_level_as_dict(net)["BP"]
     i_mat = sim._i_mat(g)
-    assert type(i_mat) is np.ndarray
+    assert sparse.isspmatrix_csr(i_mat)
     waited = np.array([[1., 0., 1.], [-1., -1., 0.], [0., 1., -1.]])
     for l in waited:
-        assert l in i_mat
+        assert l in i_mat.toarray()
+
+
+def test_node_vectors(fix_create):
+    net = fix_create
+    lev = sim._compile_level(net, "BP")
+    idx_load, m_dot_load, idx_feed, p_feed = sim._node_vectors(
+        lev, sim._scaled_loads_as_dict(net), sim._p_nom_feed_as_dict(net))
+    assert idx_load.tolist() == [1, 2]
+    assert m_dot_load.tolist() == [0.000262, 0.000394]
+    assert idx_feed.tolist() == [0]
+    assert p_feed.tolist() == [0.025E5]
 
 
 def test_dp_from_m_dot():
@@ -52,6 +64,95 @@ def test_run_sim(fix_create):
     assert m_dot_nodes == {'BUS1': -0.000656, 'BUS2': 0.000262, 'BUS3': 0.000394}
 
 
+def test_run_sim_newton(fix_create):
+    net = fix_create
+    p_nodes, m_dot_pipes, m_dot_nodes, gas = sim._run_sim(net, solver="newton")
+    assert p_nodes == {'BUS1': 2500.0, 'BUS2': 1962.7, 'BUS3': 1827.8}
+    assert m_dot_pipes == {'PIPE3': 6.6e-05, 'PIPE1': 0.000328, 'PIPE2': 0.000328}
+    assert m_dot_nodes == {'BUS1': -0.000656, 'BUS2': 0.000262, 'BUS3': 0.000394}
+
+
+def test_run_sim_loop(fix_create):
+    net = fix_create
+    p_nodes, m_dot_pipes, m_dot_nodes, gas = sim._run_sim(net, solver="loop")
+    assert p_nodes == {'BUS1': 2500.0, 'BUS2': 1962.7, 'BUS3': 1827.8}
+    assert m_dot_pipes == {'PIPE3': 6.6e-05, 'PIPE1': 0.000328, 'PIPE2': 0.000328}
+    assert m_dot_nodes == {'BUS1': -0.000656, 'BUS2': 0.000262, 'BUS3': 0.000394}
+
+
+def test_loop_basis(fix_create):
+    net = fix_create
+    lev = sim._compile_level(net, "BP")
+    loops, tree, a_tree = sim._loop_basis(lev["i_mat"], np.array([0]))
+    assert loops.shape == (1, 4)
+    assert len(tree) == 3
+    virt = sparse.csr_matrix(([1.0], ([0], [0])), shape=(3, 1))
+    assert np.allclose(sparse.hstack((lev["i_mat"], virt)) @ loops.T.toarray(), 0)
+
+
+def test_solve_loop_two_feeds():
+    gas = Chemical('natural gas', T=10+273.15, P=0.025E5)
+    i_mat = top.incidence_matrix(4, np.array([0, 1, 2]), np.array([1, 2, 3]))
+    args = (i_mat, i_mat.T.tocsr(), np.full(3, 100.0), np.full(3, 0.05), np.full(3, 1E-5), gas,
+            np.array([1, 2]), np.array([0.0003, 0.0002]), np.array([0, 3]), np.array([2500.0, 2450.0]))
+    x0 = np.concatenate((np.full(4, 2500.0), np.full(3, 0.0001), np.zeros(4)))
+    x, info = sim._solve(args, x0, solver="loop")
+    assert np.allclose(sim._eq_model(x, *args), 0)
+    assert info["n_iter"] > 0 and info["residual"] < 1E-6
+    assert np.allclose(x, sim._solve(args, x0, solver="newton")[0])
+
+
+def test_run_sim_bad_solver_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        sim._run_sim(net, solver="XX")
+
+
+def test_solve_radial(fix_create):
+    net = fix_create
+    lev = sim._compile_level(net, "BP")
+    args = sim._level_args(lev) + sim._node_vectors(lev, sim._scaled_loads_as_dict(net), sim._p_nom_feed_as_dict(net))
+    assert not sim._is_radial(args)
+
+    net.pipe.at[3, "in_service"] = False
+    lev = sim._compile_level(net, "BP")
+    args = sim._level_args(lev) + sim._node_vectors(lev, sim._scaled_loads_as_dict(net), sim._p_nom_feed_as_dict(net))
+    assert sim._is_radial(args)
+
+    x = sim._solve_radial(args)
+    assert np.allclose(sim._eq_model(x, *args), 0)
+    x_newton, _ = sim._newton(sim._eq_model, sim._jac_model, sim._init_variables(lev, 0.025E5), args)
+    assert np.allclose(x, x_newton)
+
+    p_nodes, m_dot_pipes, m_dot_nodes, gas = sim._run_sim(net)
+    assert m_dot_pipes == {'PIPE1': 0.000262, 'PIPE2': 0.000394}
+    assert m_dot_nodes == {'BUS1': -0.000656, 'BUS2': 0.000262, 'BUS3': 0.000394}
+
+
+def test_ddp_from_m_dot():
+    gas = Chemical('natural gas', T=10+273.15, P=1E5)
+    m_dot = np.array([0.0001, 0.01, 0.5])
+    l, d, e = np.full(3, 100.0), np.full(3, 0.05), np.full(3, 1.5E-6)
+    h = 1E-9 * m_dot
+    fd = (sim._dp_from_m_dot_vec(m_dot + h, l, d, e, gas) - sim._dp_from_m_dot_vec(m_dot - h, l, d, e, gas)) / (2 * h)
+    assert np.allclose(sim._ddp_dm_dot_vec(m_dot, l, d, e, gas), fd, rtol=1E-5)
+
+
+def test_dp_from_m_dot_no_flow_and_no_pipe():
+    gas = Chemical('natural gas', T=10+273.15, P=1E5)
+    m_dot = np.array([0.0, 1E-5, -1E-5])
+    l, d, e = np.full(3, 100.0), np.full(3, 0.05), np.full(3, 1.5E-6)
+
+    # laminar flows: dP = 128.mu.L.m_dot / (pi.rho.D^4), no pressure drop without flow
+    ddp_laminar = 128 * gas.mu * 100.0 / (np.pi * gas.rho * 0.05**4)
+    assert np.allclose(sim._dp_from_m_dot_vec(m_dot, l, d, e, gas), ddp_laminar * m_dot)
+    assert np.allclose(sim._ddp_dm_dot_vec(m_dot, l, d, e, gas), ddp_laminar)
+
+    empty = np.zeros(0)
+    assert sim._dp_from_m_dot_vec(empty, empty, empty, empty, gas).shape == (0,)
+    assert sim._ddp_dm_dot_vec(empty, empty, empty, empty, gas).shape == (0,)
+
+
 @pytest.fixture()
 def fix_create_full_mp():
     net = pg.create_empty_network()
@@ -85,3 +186,58 @@ def test_run_sim_mp(fix_create):
     assert p_nodes == {'BUS1': 89968.3, 'BUS2': 89949.1, 'BUS3': 89945.3, 'BUSF': 90000.0}
     assert m_dot_pipes == {'PIPE0': 0.001181, 'PIPE1': 0.000469, 'PIPE2': 0.00045, 'PIPE3': 7.5e-05}
     assert m_dot_nodes == {'BUSF': -0.001181, 'BUS1': 0.000262, 'BUS2': 0.000394, 'BUS3': 0.000525}
+
+
+@pytest.fixture()
+def fix_create_chains():
+    net = pg.create_empty_network()
+    pg.create_bus(net, level="BP", name="BUSA")
+    pg.create_buses(net, level="BP", name=["BUSN1", "BUSN2", "BUSB", "BUSD1", "BUSD2", "BUSC", "BUSE", "BUSM"])
+
+    # series A - N1 - N2 - B, dead ends B - D1 - D2 - M, ring B - C - E - B with a smaller pipe E - B
+    pg.create_pipes(net, ["BUSA", "BUSN2", "BUSN2", "BUSB", "BUSD1", "BUSD2", "BUSB", "BUSC", "BUSE", "BUSB"],
+                    ["BUSN1", "BUSN1", "BUSB", "BUSD1", "BUSD2", "BUSM", "BUSC", "BUSE", "BUSB", "BUSC"],
+                    length_m=[100, 50, 70, 20, 20, 10, 80, 60, 40, 90],
+                    diameter_m=[0.05, 0.05, 0.05, 0.03, 0.03, 0.03, 0.05, 0.05, 0.04, 0.05],
+                    name=["PIPE{}".format(i) for i in range(10)])
+    pg.create_loads(net, ["BUSB", "BUSC"], p_kW=[10.0, 5.0], name=["LOADB", "LOADC"])
+    pg.create_feeder(net, "BUSA", p_lim_kW=50, p_Pa=0.025E5, name="FEEDER")
+    return net
+
+
+def test_reduce_level(fix_create_chains):
+    lev = sim._compile_level(fix_create_chains, "BP")
+    red = sim._reduce_level(lev)
+    assert [lev["nodes"][i] for i in red["kept"]] == ["BUSA", "BUSB", "BUSC", "BUSE"]
+    assert red["i_mat"].shape == (4, 5)
+    assert red["leng"][0] == 220
+    assert sorted(red["parent"]) == [0, 1, 3, 4, 5]
+
+
+@pytest.mark.parametrize("solver", ["fsolve", "newton", "loop"])
+def test_run_sim_reduce(fix_create_chains, solver):
+    net = fix_create_chains
+    p_nodes, m_dot_pipes, m_dot_nodes, gas = sim._run_sim(net, solver=solver)
+    p_red, m_dot_red, m_dot_nodes_red, gas = sim._run_sim(net, solver=solver, options={"reduce": True})
+    assert p_red == pytest.approx(p_nodes)
+    assert m_dot_red == pytest.approx(m_dot_pipes)
+    assert m_dot_nodes_red == pytest.approx(m_dot_nodes)
+    assert m_dot_red["PIPE3"] == 0 and p_red["BUSM"] == p_red["BUSB"]
+
+    model = pg.compile_model(net, solver=solver, solver_options={"reduce": True})
+    assert model.solve()["p_Pa"] == pytest.approx(list(p_nodes.values()), rel=1E-3)
+
+
+def test_runpp_reduce_stats(fix_create_chains):
+    net = fix_create_chains
+    pg.runpp(net)
+    assert net.res_stats[["n_nodes", "n_pipes", "n_nodes_reduced", "n_pipes_reduced"]].values.tolist() == [
+        [9, 10, 9, 10]]
+
+    pg.runpp(net, solver_options={"reduce": True})
+    assert net.res_stats[["n_nodes", "n_pipes", "n_nodes_reduced", "n_pipes_reduced"]].values.tolist() == [
+        [9, 10, 4, 5]]
+
+    pg.runpp(net, solver_options={"reduce": True}, use_cache=True)
+    pg.runpp(net, solver_options={"reduce": True}, use_cache=True)
+    assert net.res_stats["cached"].all() and net.res_stats.at[0, "n_nodes_reduced"] == 4
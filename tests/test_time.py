@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pandangas as pg
+import pandangas.results as res
+
+from tests.test_core import fix_create
+
+
+def test_runpp_timeseries_same_as_runpp(fix_create):
+    net = fix_create
+    profiles = pd.DataFrame({"LOAD2": [1.0, 0.5, 1.0], "LOAD3": [1.0, 2.0, 1.0]})
+    ts = pg.runpp_timeseries(net, profiles)
+    assert ts["p_Pa"].shape == (3, 5)
+    assert ts["m_dot_pipe"].shape == (3, 4)
+
+    res.runpp(net)
+    assert np.allclose(ts["p_Pa"][0], net.res_bus.sort_index()["p_Pa"].values.astype(float), rtol=1E-3)
+    assert np.allclose(ts["m_dot_pipe"][2], net.res_pipe.sort_index()["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+    assert np.allclose(ts["m_dot_feeder"][0], net.res_feeder["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+    assert np.allclose(ts["m_dot_station"][0], net.res_station["m_dot_kg/s"].values.astype(float), rtol=1E-2)
+
+    net.load["scaling"] = [0.5, 2.0]
+    res.runpp(net)
+    assert np.allclose(ts["p_Pa"][1], net.res_bus.sort_index()["p_Pa"].values.astype(float), rtol=1E-3)
+
+
+def test_runpp_timeseries_p_kW_profile(fix_create):
+    net = fix_create
+    ts_scaling = pg.runpp_timeseries(net, pd.DataFrame({"LOAD2": [2.0]}), solver="newton")
+    ts_p_kw = pg.runpp_timeseries(net, pd.DataFrame({"LOAD2": [20.0]}), profile="p_kW", solver="newton")
+    assert np.allclose(ts_scaling["p_Pa"], ts_p_kw["p_Pa"])
+    assert len(net.res_bus.index) == 0
+
+
+def test_runpp_timeseries_unknown_load_raise_exception(fix_create):
+    net = fix_create
+    with pytest.raises(ValueError):
+        pg.runpp_timeseries(net, pd.DataFrame({"LOADX": [1.0]}))
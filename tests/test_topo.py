@@ -1,5 +1,8 @@
 import networkx as nx
+import pytest
+
 import pandangas as pg
+import pandangas.simulation as sim
 import pandangas.topology as top
 
 from tests.test_core import fix_create
@@ -50,3 +53,44 @@ def test_graphs_by_level(fix_create):
     assert set(g.keys()).issubset(set(net.LEVELS.keys()))
     assert len(g["BP"].nodes) == 3
     assert len(g["MP"].nodes) == 2
+
+
+def test_topology_creation(fix_create):
+    net = fix_create
+    pg.create_pipe(net, "BUS1", "BUS2", length_m=400, diameter_m=0.02, name="OLD_PIPE", in_service=False)
+    topo = top.create_topology(net)
+    assert topo["pipe_name"].tolist() == ["PIPE0", "PIPE1", "PIPE2", "PIPE3"]
+    assert topo["pipe_from"].tolist() == [0, 2, 2, 3]
+    assert topo["pipe_to"].tolist() == [1, 3, 4, 4]
+    assert topo["station_from"].tolist() == [1]
+    assert topo["station_to"].tolist() == [2]
+    assert topo["bus_mask"]["BP"].tolist() == [False, False, True, True, True]
+    assert topo["pipe_mask"]["MP"].tolist() == [True, False, False, False]
+
+    assert len(top.create_topology(net, only_in_service=False)["pipe_name"]) == 5
+
+
+def test_incidence_matrix_same_as_networkx(fix_create):
+    net = fix_create
+    g = top.create_nxgraph(net)
+    nodes = {n: i for i, n in enumerate(g.nodes)}
+    edges = list(g.edges())
+    i_mat = top.incidence_matrix(len(nodes), [nodes[u] for u, _ in edges], [nodes[v] for _, v in edges])
+    assert (i_mat.toarray() == nx.incidence_matrix(g, oriented=True).toarray()).all()
+
+
+def test_topology_unknown_bus_raise_exception(fix_create):
+    net = fix_create
+    net.pipe.at[3, "to_bus"] = "BUSX"
+    with pytest.raises(ValueError, match="BUSX"):
+        top.create_topology(net)
+
+    net.pipe.at[3, "in_service"] = False
+    top.create_topology(net)
+
+
+def test_compile_pipe_between_levels_raise_exception(fix_create):
+    net = fix_create
+    net.pipe.at[3, "to_bus"] = "BUS0"
+    with pytest.raises(ValueError, match="PIPE3"):
+        sim._compile_level(net, "BP")